@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+from tools.build_iwyu_macos import FAT_MAGIC, MH_MAGIC_64, read_macho_dylibs
+
+LC_SEGMENT_64 = 0x19
+LC_LOAD_DYLIB = 0xC
+LC_LOAD_WEAK_DYLIB = 0x80000018
+
+
+def _dylib_command(cmd: int, name: str) -> bytes:
+    encoded = name.encode() + b"\0"
+    cmdsize = (24 + len(encoded) + 7) & ~7
+    return struct.pack("<IIIIII", cmd, cmdsize, 24, 2, 0x10000, 0x10000) + encoded.ljust(cmdsize - 24, b"\0")
+
+
+def _macho(dylibs: list[tuple[int, str]]) -> bytes:
+    commands = struct.pack("<II", LC_SEGMENT_64, 72) + bytes(64)
+    commands += b"".join(_dylib_command(cmd, name) for cmd, name in dylibs)
+    ncmds = 1 + len(dylibs)
+    header = struct.pack("<IiiIIIII", MH_MAGIC_64, 0x01000007, 3, 2, ncmds, len(commands), 0, 0)
+    return header + commands
+
+
+class MachODylibTests(unittest.TestCase):
+    def test_reads_load_and_weak_dylibs_in_order(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            binary = Path(directory) / "include-what-you-use"
+            binary.write_bytes(
+                _macho(
+                    [
+                        (LC_LOAD_DYLIB, "/usr/lib/libSystem.B.dylib"),
+                        (LC_LOAD_WEAK_DYLIB, "@rpath/libclang-cpp.dylib"),
+                    ]
+                )
+            )
+            self.assertEqual(
+                read_macho_dylibs(binary), ["/usr/lib/libSystem.B.dylib", "@rpath/libclang-cpp.dylib"]
+            )
+
+    def test_reads_first_slice_of_universal_binary(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            binary = Path(directory) / "include-what-you-use"
+            slice_ = _macho([(LC_LOAD_DYLIB, "/usr/lib/libc++.1.dylib")])
+            fat_header = struct.pack(">II", FAT_MAGIC, 1) + struct.pack(">iiIII", 0x01000007, 3, 4096, len(slice_), 12)
+            binary.write_bytes(fat_header.ljust(4096, b"\0") + slice_)
+            self.assertEqual(read_macho_dylibs(binary), ["/usr/lib/libc++.1.dylib"])
+
+    def test_rejects_non_macho(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            binary = Path(directory) / "include-what-you-use"
+            binary.write_bytes(b"\x7fELF" + bytes(60))
+            with self.assertRaisesRegex(RuntimeError, "Not a Mach-O"):
+                read_macho_dylibs(binary)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+from tools.create_hardlink_archive import add_tree, tar_filter
+
+
+class AddTreeTests(unittest.TestCase):
+    def _make_tree(self, root: Path) -> None:
+        (root / "bin").mkdir()
+        (root / "lib" / "clang" / "21" / "bin").mkdir(parents=True)
+        (root / "lib" / "empty").mkdir()
+        (root / "bin" / "clang.exe").write_bytes(os.urandom(5000))
+        os.link(root / "bin" / "clang.exe", root / "bin" / "clang++.exe")
+        os.link(root / "bin" / "clang.exe", root / "lib" / "clang-copy")
+        (root / "lib" / "libfoo.so.1").write_bytes(b"so")
+        (root / "lib" / "clang" / "21" / "bin" / "hwasan_symbolize").write_bytes(b"py")
+        (root / "lib" / "clang" / "21" / "bin" / "hwasan_symbolize").chmod(0o600)
+        if hasattr(os, "symlink"):
+            (root / "lib" / "libfoo.so").symlink_to("libfoo.so.1")
+
+    def _build(self, add) -> bytes:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w|") as tar:
+            add(tar)
+        return buffer.getvalue()
+
+    def test_matches_tarfile_add(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory) / "win_hardlinked"
+            root.mkdir()
+            self._make_tree(root)
+
+            expected = self._build(lambda tar: tar.add(root, arcname=root.name, filter=tar_filter))
+            actual = self._build(lambda tar: add_tree(tar, str(root), root.name, tar_filter))
+
+            self.assertEqual(actual, expected)
+
+    def test_duplicates_are_stored_as_hard_links(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory) / "win_hardlinked"
+            root.mkdir()
+            self._make_tree(root)
+
+            data = self._build(lambda tar: add_tree(tar, str(root), root.name, tar_filter))
+            with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+                links = {member.name: member.linkname for member in tar if member.islnk()}
+
+            self.assertEqual(
+                links,
+                {
+                    "win_hardlinked/bin/clang.exe": "win_hardlinked/bin/clang++.exe",
+                    "win_hardlinked/lib/clang-copy": "win_hardlinked/bin/clang++.exe",
+                },
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
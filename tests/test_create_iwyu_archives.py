@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+from tools.create_iwyu_archives import create_tar_archive, tar_filter, verify_tar_permissions
+
+
+def filtered_mode(name: str, mode: int = 0o600) -> int:
+    tarinfo = tarfile.TarInfo(name)
+    tarinfo.mode = mode
+    with contextlib.redirect_stdout(io.StringIO()):
+        return tar_filter(tarinfo).mode
+
+
+class TarFilterTests(unittest.TestCase):
+    def test_bin_executables_get_execute_bit(self) -> None:
+        for name in (
+            "bin/include-what-you-use",
+            "bin/include-what-you-use.exe",
+            "bin/iwyu_tool.py",
+            "bin/fix_includes.py",
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(filtered_mode(name), 0o755)
+
+    def test_other_bin_files_are_not_executable(self) -> None:
+        self.assertEqual(filtered_mode("bin/README", 0o777), 0o644)
+
+    def test_share_files_are_not_executable(self) -> None:
+        for name in ("share/include-what-you-use/qt5.imp", "share/include-what-you-use/gcc.libc.imp"):
+            with self.subTest(name=name):
+                self.assertEqual(filtered_mode(name, 0o777), 0o644)
+
+    def test_lib_shared_libraries_are_executable(self) -> None:
+        self.assertEqual(filtered_mode("lib/libLLVM.so"), 0o755)
+        self.assertEqual(filtered_mode("lib/libLLVM.so.21"), 0o755)
+        self.assertEqual(filtered_mode("lib/libclang.a", 0o777), 0o644)
+
+    def test_top_level_files_are_not_executable(self) -> None:
+        self.assertEqual(filtered_mode("LICENSE.TXT", 0o777), 0o644)
+
+    def test_created_archive_passes_verification(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            source = Path(directory)
+            (source / "bin").mkdir()
+            (source / "share" / "include-what-you-use").mkdir(parents=True)
+            (source / "bin" / "include-what-you-use").write_bytes(b"\x7fELF")
+            (source / "bin" / "iwyu_tool.py").write_text("print(1)\n")
+            (source / "share" / "include-what-you-use" / "qt5.imp").write_text("[]")
+            (source / "LICENSE.TXT").write_text("license")
+            for path in source.rglob("*"):
+                if path.is_file():
+                    path.chmod(0o600)
+
+            tar_file = source / "iwyu.tar"
+            with contextlib.redirect_stdout(io.StringIO()):
+                create_tar_archive(source, tar_file)
+                checked = verify_tar_permissions(tar_file)
+
+            self.assertEqual(checked, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
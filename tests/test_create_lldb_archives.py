@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import io
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+from tools.create_lldb_archives import create_tar_zst_archive, tar_filter, verify_tar_permissions
+
+
+def filtered_mode(name: str, mode: int = 0o600) -> int:
+    tarinfo = tarfile.TarInfo(name)
+    tarinfo.mode = mode
+    with contextlib.redirect_stdout(io.StringIO()):
+        return tar_filter(tarinfo).mode
+
+
+class TarFilterTests(unittest.TestCase):
+    def test_bin_files_are_executable(self) -> None:
+        for name in ("bin/lldb", "bin/lldb-server.exe", "bin/liblldb.dll", "python/bin/lldb-python"):
+            with self.subTest(name=name):
+                self.assertEqual(filtered_mode(name), 0o755)
+
+    def test_other_files_are_not_executable(self) -> None:
+        for name in ("lib/liblldb.21.dylib", "python/lib/site-packages/lldb/__init__.py", "LICENSE.TXT"):
+            with self.subTest(name=name):
+                self.assertEqual(filtered_mode(name, 0o777), 0o644)
+
+    def test_directories_are_untouched(self) -> None:
+        tarinfo = tarfile.TarInfo("bin")
+        tarinfo.type = tarfile.DIRTYPE
+        tarinfo.mode = 0o700
+        self.assertEqual(tar_filter(tarinfo).mode, 0o700)
+
+    def test_created_archive_passes_verification(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            source = Path(directory) / "lldb_extracted"
+            (source / "bin").mkdir(parents=True)
+            (source / "lib").mkdir()
+            for name in ("lldb", "lldb-server", "lldb-argdumper"):
+                (source / "bin" / name).write_bytes(b"\x7fELF")
+                (source / "bin" / name).chmod(0o600)
+            (source / "lib" / "liblldb.so.21").write_bytes(b"\x7fELF")
+
+            zst_file = Path(directory) / "lldb.tar.zst"
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, sha256 = create_tar_zst_archive(source, zst_file, level=3, threads=1)
+                checked = verify_tar_permissions(zst_file)
+
+            self.assertEqual(checked, 3)
+            self.assertEqual(sha256, hashlib.sha256(zst_file.read_bytes()).hexdigest())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import tools.join
+from tools.join import join_parts, load_manifest, writev_parts
+
+JOIN_SCRIPT = Path(__file__).parents[1] / "tools" / "join.py"
+
+
+class JoinTests(unittest.TestCase):
+    def _split(self, root: Path, data: bytes, part_size: int) -> list[Path]:
+        parts = []
+        for index in range(0, len(data), part_size):
+            part = root / f"archive.tar.zst.part{len(parts) + 1}"
+            part.write_bytes(data[index : index + part_size])
+            parts.append(part)
+        return parts
+
+    def test_join_parts_restores_original_bytes(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            data = os.urandom(3 * 1024 * 1024 + 17)
+            parts = self._split(root, data, 1024 * 1024)
+            output = join_parts(parts, root / "archive.tar.zst")
+            self.assertEqual(output.read_bytes(), data)
+
+    @unittest.skipUnless(hasattr(os, "writev"), "requires os.writev")
+    def test_writev_parts_batches_across_parts(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            data = os.urandom(1_000_003)
+            parts = self._split(root, data, 300_001)
+            empty = root / "empty.part"
+            empty.write_bytes(b"")
+            parts.insert(1, empty)
+            with patch.object(tools.join, "MAX_WRITEV_BYTES", 100_000), open(root / "archive.tar.zst", "wb") as out:
+                writev_parts(parts, out)
+            self.assertEqual((root / "archive.tar.zst").read_bytes(), data)
+
+    def test_shipped_script_reads_sibling_manifest(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            root = Path(directory)
+            data = os.urandom(200_000)
+            parts = self._split(root, data, 64 * 1024)
+            manifest = {"output": "archive.tar.zst", "parts": [part.name for part in parts]}
+            (root / "archive.tar.zst.join.json").write_text(json.dumps(manifest))
+            script = root / "archive.tar.zst.join.py"
+            script.write_bytes(JOIN_SCRIPT.read_bytes())
+
+            self.assertEqual(load_manifest(root / "archive.tar.zst.join.json"), (parts, root / "archive.tar.zst"))
+            subprocess.run([sys.executable, script.name], cwd=root, check=True, capture_output=True)
+            self.assertEqual((root / "archive.tar.zst").read_bytes(), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,12 +13,25 @@ LLVM Version Requirements:
 - macOS ARM64: LLVM 21.1.6 -> IWYU 0.25
 """
 
+import contextlib
+import functools
+import os
 import platform
 import shutil
+import struct
 import subprocess
 import sys
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
 from pathlib import Path
 
+try:
+    from .file_utils import copy_file_fast
+except ImportError:
+    from file_utils import copy_file_fast
+
 # IWYU version mapping based on LLVM versions
 IWYU_VERSION_MAP = {
     "19.1.7": "0.22",  # macOS x86_64 (current)
@@ -32,6 +45,28 @@ LLVM_VERSIONS = {
     "arm64": "21.1.6",
 }
 
+# Mach-O constants for reading dylib dependencies without otool
+MH_MAGIC = 0xFEEDFACE
+MH_MAGIC_64 = 0xFEEDFACF
+FAT_MAGIC = 0xCAFEBABE
+FAT_MAGIC_64 = 0xCAFEBABF
+LC_DYLIB_COMMANDS = {
+    0xC,  # LC_LOAD_DYLIB
+    0x20,  # LC_LAZY_LOAD_DYLIB
+    0x80000018,  # LC_LOAD_WEAK_DYLIB
+    0x8000001F,  # LC_REEXPORT_DYLIB
+    0x80000023,  # LC_LOAD_UPWARD_DYLIB
+}
+
+# Read size for streaming downloads to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Multi-threaded decompressors tar can hand off to, keyed by archive suffix
+PARALLEL_DECOMPRESSORS = {
+    ".gz": "pigz",
+    ".zst": "pzstd",
+}
+
 
 def get_current_arch():
     """Get current macOS architecture."""
@@ -44,43 +79,266 @@ def get_current_arch():
         raise RuntimeError(f"Unsupported architecture: {machine}")
 
 
+def iwyu_source_url(version: str) -> str:
+    """Get the GitHub source tarball URL for an IWYU release tag."""
+    return f"https://github.com/include-what-you-use/include-what-you-use/archive/refs/tags/{version}.tar.gz"
+
+
+def _homebrew_opt_path(formula: str) -> Path:
+    """Get the opt/<formula> symlink Homebrew keeps for installed formulae."""
+    default_prefix = "/opt/homebrew" if platform.machine() == "arm64" else "/usr/local"
+    return Path(os.environ.get("HOMEBREW_PREFIX", default_prefix)) / "opt" / formula
+
+
+def ensure_homebrew_formula(formula: str) -> None:
+    """Install a Homebrew formula unless it is already installed."""
+    if _homebrew_opt_path(formula).exists():
+        print(f"✓ Already installed: {formula}")
+        return
+
+    if shutil.which("brew") is None:
+        raise RuntimeError("Homebrew (brew) not found on PATH")
+
+    result = subprocess.run(["brew", "list", "--versions", formula], capture_output=True, text=True)
+    if result.returncode == 0 and result.stdout.strip():
+        print(f"✓ Already installed: {result.stdout.strip()}")
+        return
+
+    subprocess.run(["brew", "install", formula], check=True)
+
+
+@functools.lru_cache(maxsize=None)
+def _homebrew_llvm_prefix(formula: str = "llvm") -> str:
+    """Get (and memoize) the Homebrew install prefix of an LLVM formula.
+
+    Reads the opt/<formula> symlink directly; only asks brew (a Ruby
+    startup) when it isn't where expected.
+    """
+    opt_path = _homebrew_opt_path(formula)
+    if opt_path.exists():
+        return str(opt_path)
+
+    result = subprocess.run(["brew", "--prefix", formula], capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+
+@functools.lru_cache(maxsize=None)
+def prepare_homebrew_llvm(formula: str = "llvm") -> str:
+    """Install a Homebrew LLVM formula if needed and return its prefix.
+
+    Memoized, so main() can start it ahead of build_iwyu() in the background.
+    """
+    ensure_homebrew_formula(formula)
+    return _homebrew_llvm_prefix(formula)
+
+
 def download_iwyu_source(version: str, work_dir: Path) -> Path:
-    """Download IWYU source code."""
+    """Download IWYU source code.
+
+    Streams the tarball to disk in-process. Revalidates an existing tarball
+    with If-None-Match (ETag stored next to it) so re-runs get a 304
+    instead of the full payload, and resumes an interrupted download with
+    an HTTP Range request.
+    """
     print(f"\n{'='*70}")
     print(f"DOWNLOADING IWYU {version} SOURCE")
     print(f"{'='*70}\n")
 
-    url = f"https://github.com/include-what-you-use/include-what-you-use/archive/refs/tags/{version}.tar.gz"
+    url = iwyu_source_url(version)
     tarball = work_dir / f"iwyu-{version}.tar.gz"
+    etag_file = work_dir / f"iwyu-{version}.etag"
+    partial = work_dir / f"iwyu-{version}.tar.gz.new"
+    partial_etag_file = work_dir / f"iwyu-{version}.tar.gz.new.etag"
 
     print(f"URL: {url}")
     print(f"Output: {tarball}")
 
-    subprocess.run(["curl", "-L", url, "-o", str(tarball)], check=True)
+    headers = {}
+    resume_from = partial.stat().st_size if partial.exists() else 0
+    if resume_from:
+        # Continue an interrupted download; If-Range makes the server send
+        # the full body instead if the tarball changed meanwhile
+        print(f"Resuming from {resume_from / (1024*1024):.2f} MB")
+        headers["Range"] = f"bytes={resume_from}-"
+        if partial_etag_file.exists():
+            headers["If-Range"] = partial_etag_file.read_text().strip()
+    elif tarball.exists():
+        headers["If-Modified-Since"] = formatdate(tarball.stat().st_mtime, usegmt=True)
+        if etag_file.exists():
+            headers["If-None-Match"] = etag_file.read_text().strip()
+
+    try:
+        response = urllib.request.urlopen(urllib.request.Request(url, headers=headers))
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            partial.unlink(missing_ok=True)
+            print(f"✓ Cached tarball is up to date ({tarball.stat().st_size / (1024*1024):.2f} MB)")
+            return tarball
+        if e.code == 416 and resume_from:
+            print("⚠️  Cannot resume partial download - starting over")
+            partial.unlink()
+            return download_iwyu_source(version, work_dir)
+        raise
+
+    with response:
+        etag = response.headers.get("ETag")
+        if etag:
+            partial_etag_file.write_text(etag + "\n")
+
+        # 206 continues the partial file; a 200 (no range support, or
+        # If-Range mismatch) carries the full body
+        mode = "ab" if response.status == 206 else "wb"
+        with open(partial, mode) as f:
+            shutil.copyfileobj(response, f, DOWNLOAD_CHUNK_SIZE)
+
+    partial.replace(tarball)
+    if etag:
+        partial_etag_file.replace(etag_file)
+    else:
+        etag_file.unlink(missing_ok=True)
 
     print(f"✓ Downloaded {tarball.stat().st_size / (1024*1024):.2f} MB")
 
     return tarball
 
 
+def read_macho_dylibs(binary: Path) -> list[str]:
+    """List the dylibs a Mach-O binary loads (what otool -L reports).
+
+    Universal binaries are read from their first architecture slice.
+
+    Args:
+        binary: Path to Mach-O executable or dylib
+
+    Returns:
+        Install names from the LC_*_DYLIB load commands, in order
+    """
+    with open(binary, "rb") as f:
+        header = f.read(32)
+        if len(header) < 8:
+            raise RuntimeError(f"Not a Mach-O binary: {binary}")
+
+        base = 0
+        fat_magic = struct.unpack_from(">I", header)[0]
+        if fat_magic in (FAT_MAGIC, FAT_MAGIC_64):
+            # fat_arch(_64): cputype, cpusubtype, offset, ...
+            if fat_magic == FAT_MAGIC:
+                base = struct.unpack_from(">I", header, 16)[0]
+            else:
+                base = struct.unpack_from(">Q", header, 16)[0]
+            f.seek(base)
+            header = f.read(32)
+
+        magic = struct.unpack_from("<I", header)[0]
+        if magic == MH_MAGIC_64:
+            header_size = 32
+        elif magic == MH_MAGIC:
+            header_size = 28
+        else:
+            raise RuntimeError(f"Not a Mach-O binary: {binary}")
+
+        ncmds, sizeofcmds = struct.unpack_from("<II", header, 16)
+        f.seek(base + header_size)
+        commands = f.read(sizeofcmds)
+
+    dylibs = []
+    offset = 0
+    for _ in range(ncmds):
+        cmd, cmdsize = struct.unpack_from("<II", commands, offset)
+        if cmd in LC_DYLIB_COMMANDS:
+            name_offset = struct.unpack_from("<I", commands, offset + 8)[0]
+            name = commands[offset + name_offset : offset + cmdsize].split(b"\0", 1)[0]
+            dylibs.append(name.decode("utf-8", errors="replace"))
+        offset += cmdsize
+    return dylibs
+
+
+def tar_extract_command(tarball: Path | str, dest_dir: Path, suffix: str | None = None) -> list[str]:
+    """Build a tar extraction command, using pigz/pzstd when available.
+
+    Prefers bsdtar (libarchive), which detects gzip/zstd/xz itself and
+    decompresses in-process; GNU tar needs an explicit compression flag.
+
+    Args:
+        tarball: Path to .tar.gz or .tar.zst archive, or "-" for stdin
+        dest_dir: Directory to extract into
+        suffix: Compression suffix (default: taken from tarball)
+
+    Returns:
+        Command line for subprocess.run()
+    """
+    if suffix is None:
+        suffix = Path(tarball).suffix
+
+    bsdtar = shutil.which("bsdtar")
+    tar = bsdtar or "tar"
+
+    decompressor = PARALLEL_DECOMPRESSORS.get(suffix)
+    if decompressor and shutil.which(decompressor):
+        program = f"{decompressor} -d -p {os.cpu_count() or 4}"
+        return [tar, "--use-compress-program", program, "-xf", str(tarball), "-C", str(dest_dir)]
+
+    if bsdtar:
+        return [bsdtar, "-xf", str(tarball), "-C", str(dest_dir)]
+
+    compression_flag = "--zstd" if suffix == ".zst" else "-z"
+    return ["tar", compression_flag, "-xf", str(tarball), "-C", str(dest_dir)]
+
+
+def find_source_dir(version: str, work_dir: Path) -> Path:
+    """Locate the extracted IWYU source directory."""
+    source_dir = work_dir / f"include-what-you-use-{version}"
+
+    if not source_dir.exists():
+        raise RuntimeError(f"Source directory not found: {source_dir}")
+
+    print(f"✓ Extracted to {source_dir}")
+
+    return source_dir
+
+
 def extract_source(tarball: Path, work_dir: Path) -> Path:
     """Extract IWYU source tarball."""
     print(f"\n{'='*70}")
     print("EXTRACTING SOURCE")
     print(f"{'='*70}\n")
 
-    subprocess.run(["tar", "-xzf", str(tarball), "-C", str(work_dir)], check=True)
+    subprocess.run(tar_extract_command(tarball, work_dir), check=True)
 
-    # Find extracted directory
     version = tarball.stem.replace("iwyu-", "").replace(".tar", "")
-    source_dir = work_dir / f"include-what-you-use-{version}"
+    return find_source_dir(version, work_dir)
 
-    if not source_dir.exists():
-        raise RuntimeError(f"Source directory not found: {source_dir}")
 
-    print(f"✓ Extracted to {source_dir}")
+def stream_iwyu_source(version: str, work_dir: Path) -> Path:
+    """Download and extract IWYU source in one pass (urllib | tar).
 
-    return source_dir
+    The response is copied straight into tar's stdin, so the tarball never
+    touches the disk and no curl process is started; use
+    download_iwyu_source() + extract_source() when the tarball should be kept.
+    """
+    print(f"\n{'='*70}")
+    print(f"STREAMING IWYU {version} SOURCE")
+    print(f"{'='*70}\n")
+
+    url = iwyu_source_url(version)
+    print(f"URL: {url}")
+
+    with urllib.request.urlopen(url) as response:
+        tar = subprocess.Popen(tar_extract_command("-", work_dir, suffix=".gz"), stdin=subprocess.PIPE)
+        try:
+            shutil.copyfileobj(response, tar.stdin, DOWNLOAD_CHUNK_SIZE)
+        except BrokenPipeError:
+            pass  # tar exited early; its exit status below says why
+        finally:
+            # Closing stdin signals end of input to tar
+            with contextlib.suppress(BrokenPipeError):
+                tar.stdin.close()
+            returncode = tar.wait()
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, tar.args)
+
+    return find_source_dir(version, work_dir)
 
 
 def build_iwyu(source_dir: Path, llvm_path: Path, arch: str, static_linking: bool = True) -> Path:
@@ -106,16 +364,7 @@ def build_iwyu(source_dir: Path, llvm_path: Path, arch: str, static_linking: boo
     print(f"Installing LLVM {llvm_version} via Homebrew (for CMake configs)...")
     # Use LLVM 21 for both x86_64 and ARM64 (LLVM current stable)
     llvm_formula = "llvm"
-    subprocess.run(["brew", "install", llvm_formula], check=True)
-
-    # Find Homebrew LLVM path
-    result = subprocess.run(
-        ["brew", "--prefix", llvm_formula],
-        capture_output=True,
-        text=True,
-        check=True
-    )
-    homebrew_llvm_path = result.stdout.strip()
+    homebrew_llvm_path = prepare_homebrew_llvm(llvm_formula)
 
     print(f"Homebrew LLVM Path: {homebrew_llvm_path}")
     print(f"Build Dir: {build_dir}")
@@ -132,10 +381,14 @@ def build_iwyu(source_dir: Path, llvm_path: Path, arch: str, static_linking: boo
             print("⚠️  WARNING: No static libraries (.a) found!")
             print("   Static linking may not work. Consider building LLVM from source.")
 
+    # Prefer Ninja; fall back to Makefiles when it isn't installed
+    generator = "Ninja" if shutil.which("ninja") else "Unix Makefiles"
+    print(f"CMake Generator: {generator}")
+
     # CMake configuration using Homebrew LLVM
     cmake_cmd = [
         "cmake",
-        "-G", "Unix Makefiles",
+        "-G", generator,
         f"-DCMAKE_PREFIX_PATH={homebrew_llvm_path}",
         "-DCMAKE_BUILD_TYPE=Release",
     ]
@@ -152,19 +405,49 @@ def build_iwyu(source_dir: Path, llvm_path: Path, arch: str, static_linking: boo
             "-DBUILD_SHARED_LIBS=OFF",
         ])
 
+    # Link with lld + ThinLTO when Homebrew provides ld64.lld (the llvm
+    # formula no longer bundles it; the separate lld formula does)
+    env = os.environ.copy()
+    llvm_bin = Path(homebrew_llvm_path) / "bin"
+    env["PATH"] = os.pathsep.join([str(llvm_bin), env.get("PATH", "")])
+    lld = shutil.which("ld64.lld", path=env["PATH"])
+    if lld:
+        print(f"\n🔗 Using lld + ThinLTO ({lld})")
+        cmake_cmd.extend([
+            # Homebrew clang, so ThinLTO bitcode matches the lld that reads it
+            f"-DCMAKE_C_COMPILER={llvm_bin / 'clang'}",
+            f"-DCMAKE_CXX_COMPILER={llvm_bin / 'clang++'}",
+            "-DLLVM_USE_LINKER=lld",
+            "-DLLVM_ENABLE_LTO=Thin",
+        ])
+    else:
+        print("\nld64.lld not found - using the default linker (brew install lld to enable)")
+
+    # Reuse object files across runs; the cache lives in the work dir (next
+    # to the re-extracted source) unless CCACHE_DIR/SCCACHE_DIR is set
+    for launcher, cache_var in (("ccache", "CCACHE_DIR"), ("sccache", "SCCACHE_DIR")):
+        launcher_path = shutil.which(launcher)
+        if launcher_path:
+            env.setdefault(cache_var, str(source_dir.parent / launcher))
+            print(f"\n⚡ Using {launcher} ({cache_var}={env[cache_var]})")
+            cmake_cmd.extend([
+                f"-DCMAKE_C_COMPILER_LAUNCHER={launcher_path}",
+                f"-DCMAKE_CXX_COMPILER_LAUNCHER={launcher_path}",
+            ])
+            break
+
     cmake_cmd.append("..")
 
     print("\nCMake command:")
     print(" ".join(cmake_cmd))
-    subprocess.run(cmake_cmd, cwd=build_dir, check=True)
+    subprocess.run(cmake_cmd, cwd=build_dir, env=env, check=True)
 
     # Build
-    import os
     cpu_count = os.cpu_count() or 4
-    make_cmd = ["make", f"-j{cpu_count}"]
+    build_cmd = ["cmake", "--build", ".", "-j", str(cpu_count)]
 
-    print(f"\n{' '.join(make_cmd)}")
-    subprocess.run(make_cmd, cwd=build_dir, check=True)
+    print(f"\n{' '.join(build_cmd)}")
+    subprocess.run(build_cmd, cwd=build_dir, env=env, check=True)
 
     # Verify linking and strip if static
     binary_path = build_dir / "bin" / "include-what-you-use"
@@ -175,16 +458,12 @@ def build_iwyu(source_dir: Path, llvm_path: Path, arch: str, static_linking: boo
 
         # Check dependencies
         print("\nChecking dynamic library dependencies...")
-        result = subprocess.run(
-            ["otool", "-L", str(binary_path)],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        print(result.stdout)
+        dylibs = read_macho_dylibs(binary_path)
+        for dylib in dylibs:
+            print(f"\t{dylib}")
 
         # Check for LLVM dependencies
-        if "LLVM" in result.stdout or "clang" in result.stdout.lower():
+        if any("LLVM" in dylib or "clang" in dylib.lower() for dylib in dylibs):
             print("\n⚠️  WARNING: Binary has LLVM/Clang dynamic dependencies!")
             print("   Static linking may have failed.")
             if static_linking:
@@ -206,6 +485,45 @@ def build_iwyu(source_dir: Path, llvm_path: Path, arch: str, static_linking: boo
     return build_dir
 
 
+@functools.lru_cache(maxsize=1)
+def _libsystem():
+    """Load libSystem (macOS only) for clonefile(2)."""
+    import ctypes
+
+    return ctypes.CDLL("/usr/lib/libSystem.B.dylib", use_errno=True)
+
+
+def _clonefile(src: Path, dst: Path) -> None:
+    """Create an APFS copy-on-write clone of src at dst."""
+    import ctypes
+
+    # clonefile() refuses to overwrite, unlike shutil.copy2()
+    dst.unlink(missing_ok=True)
+    if _libsystem().clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err), str(src))
+
+
+def _fast_copy(src: Path, dst: Path) -> None:
+    """Copy a file with clonefile on macOS, else copy_file_fast.
+
+    Args:
+        src: Source file
+        dst: Destination file or directory
+    """
+    if dst.is_dir():
+        dst = dst / src.name
+
+    if sys.platform == "darwin":
+        try:
+            _clonefile(src, dst)
+            return
+        except (AttributeError, OSError):
+            pass
+
+    copy_file_fast(src, dst)
+
+
 def install_iwyu(build_dir: Path, output_dir: Path) -> None:
     """Install IWYU to output directory."""
     print(f"\n{'='*70}")
@@ -226,20 +544,23 @@ def install_iwyu(build_dir: Path, output_dir: Path) -> None:
     if not binary_src.exists():
         raise RuntimeError(f"Binary not found: {binary_src}")
 
-    shutil.copy2(binary_src, bin_dir / "include-what-you-use")
+    _fast_copy(binary_src, bin_dir / "include-what-you-use")
     print(f"✓ Copied {binary_src} -> {bin_dir}")
 
     # Copy iwyu_tool.py if it exists
     iwyu_tool = build_dir.parent / "iwyu_tool.py"
     if iwyu_tool.exists():
-        shutil.copy2(iwyu_tool, bin_dir / "iwyu_tool.py")
+        _fast_copy(iwyu_tool, bin_dir / "iwyu_tool.py")
         print(f"✓ Copied {iwyu_tool} -> {bin_dir}")
 
     # Copy mapping files
     mappings_src = build_dir.parent
-    for mapping_file in mappings_src.glob("*.imp"):
-        shutil.copy2(mapping_file, share_dir)
-        print(f"✓ Copied {mapping_file.name} -> {share_dir}")
+    mapping_files = sorted(mappings_src.glob("*.imp"))
+    if mapping_files:
+        with ThreadPoolExecutor(max_workers=min(32, len(mapping_files))) as executor:
+            list(executor.map(lambda mapping_file: _fast_copy(mapping_file, share_dir), mapping_files))
+        for mapping_file in mapping_files:
+            print(f"✓ Copied {mapping_file.name} -> {share_dir}")
 
     print(f"\n✓ IWYU installed to {output_dir}")
 
@@ -262,6 +583,8 @@ def main():
                        help="Use static linking (default: True, recommended)")
     parser.add_argument("--dynamic", action="store_true",
                        help="Use dynamic linking (not recommended, for debugging)")
+    parser.add_argument("--keep-tarball", action="store_true",
+                       help="Keep the source tarball in the work dir (revalidated via ETag on re-runs) instead of streaming it into tar")
 
     args = parser.parse_args()
 
@@ -301,11 +624,18 @@ def main():
 
     # Build pipeline
     try:
-        # Step 1: Download source
-        tarball = download_iwyu_source(iwyu_version, work_dir)
-
-        # Step 2: Extract source
-        source_dir = extract_source(tarball, work_dir)
+        # Step 1+2: Download and extract source, while Homebrew LLVM installs
+        # in the background (network/disk vs. brew - nothing shared)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            homebrew_llvm = executor.submit(prepare_homebrew_llvm, "llvm")
+
+            if args.keep_tarball:
+                tarball = download_iwyu_source(iwyu_version, work_dir)
+                source_dir = extract_source(tarball, work_dir)
+            else:
+                source_dir = stream_iwyu_source(iwyu_version, work_dir)
+
+            homebrew_llvm.result()
 
         # Step 3: Build
         build_dir = build_iwyu(source_dir, llvm_path, target_arch, static_linking)
@@ -6,20 +6,204 @@ This script:
 1. Reads the deduplication manifest
 2. Creates a directory structure with hard links (not copies!)
 3. Creates a tar archive (tar automatically detects and stores hard links efficiently)
-4. Compresses with zstd level 22
+4. Compresses with zstd level 19 plus long-distance matching
 
 The tar format natively supports hard links - when multiple files have the
 same inode, tar stores the data once and creates link entries for duplicates.
 """
 
+import contextlib
+import functools
 import json
 import os
 import shutil
+import stat
 import sys
+import tarfile
+import time
+from collections import defaultdict
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def create_hardlink_structure(manifest_path: Path | str, canonical_dir: Path | str, output_dir: Path | str) -> Path:
+try:
+    import grp
+    import pwd
+except ImportError:  # Windows
+    grp = pwd = None
+
+try:
+    from .zstd_utils import DEFAULT_ZSTD_LEVEL, zstd_compressor
+except ImportError:
+    from zstd_utils import DEFAULT_ZSTD_LEVEL, zstd_compressor
+
+# Buffer size for writing tar archives
+TAR_WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+
+# File extensions (text after the last ".") that tar_filter classifies
+DATA_SUFFIXES = frozenset({"h", "inc", "modulemap", "tcc", "txt", "a", "syms"})
+SHARED_LIB_SUFFIXES = frozenset({"so", "dylib"})
+
+
+@functools.lru_cache(maxsize=None)
+def member_mode(dirname: str, suffix: str, so_versioned: bool) -> int | None:
+    """Archive mode for a regular file, or None to keep the file's own mode.
+
+    The result depends only on the member's directory, its extension and
+    whether the name contains ".so.", and an archive has few distinct
+    combinations, so the rules run once per combination rather than once
+    per member.
+
+    Args:
+        dirname: Member path without the file name (e.g. "win_hardlinked/lib/clang/21/bin")
+        suffix: Text after the last "." of the file name ("" if none)
+        so_versioned: Whether the member name contains ".so." (versioned shared library)
+    """
+    # Directory components below the archive root ("/bin/" in name <=> "bin" in dirs)
+    dirs = dirname.split("/")[1:]
+
+    # Set executable permissions for files in main bin/ directory
+    if "bin" in dirs and "lib" not in dirs:
+        return 0o755  # rwxr-xr-x
+    # Set executable permissions for shared libraries and certain executables in lib/
+    if "lib" in dirs:
+        # Headers, text files, and static libraries should be readable but not executable (check first)
+        if suffix in DATA_SUFFIXES:
+            return 0o644  # rw-r--r--
+        # Shared libraries (.so, .dylib) need executable permissions on Unix
+        if suffix in SHARED_LIB_SUFFIXES or so_versioned:
+            return 0o755  # rwxr-xr-x for shared libraries
+        # Executable binaries in lib/clang/*/bin/ directories
+        if "bin" in dirs:
+            return 0o755  # rwxr-xr-x
+    return None
+
+
+def tar_filter(tarinfo: tarfile.TarInfo) -> tarfile.TarInfo:
+    """Filter to set correct permissions for binaries and shared libraries."""
+    if tarinfo.isfile():
+        name = tarinfo.name
+        dirname, _, basename = name.rpartition("/")
+        _, dot, suffix = basename.rpartition(".")
+        mode = member_mode(dirname, suffix if dot else "", ".so." in name)
+        if mode is not None:
+            tarinfo.mode = mode
+    return tarinfo
+
+
+def recording_tar_filter(member_modes: list[tuple[str, int]], verbose: bool = False):
+    """Wrap tar_filter so the final mode of every regular file is recorded.
+
+    The recorded (name, mode) pairs are exactly what ends up in the archive,
+    so verify_tar_permissions can check them without reading the tar back.
+    With verbose, every executable member is printed as it is written.
+    """
+
+    def _filter(tarinfo: tarfile.TarInfo) -> tarfile.TarInfo:
+        tarinfo = tar_filter(tarinfo)
+        if tarinfo.isfile():
+            member_modes.append((tarinfo.name, tarinfo.mode))
+            if verbose and tarinfo.mode & 0o100:
+                print(f"  Setting executable: {tarinfo.name}")
+        return tarinfo
+
+    return _filter
+
+
+def add_tree(tar: tarfile.TarFile, path: str, arcname: str, filter) -> None:
+    """Add a directory tree to tar, like tar.add(path, arcname, filter=filter).
+
+    tar.add() lists each directory and then lstat()s every entry by path.
+    This walks the tree with os.scandir instead, building each TarInfo from
+    the entry's stat (free on Windows, where scandir returns it with the
+    listing), and resolves owner/group names once per id instead of once
+    per member. Members come out in the same sorted order with the same
+    hard link detection, so the archive matches what tar.add writes.
+    """
+    owner_names: dict[tuple[int, int], tuple[str, str]] = {}
+
+    def names_for(uid: int, gid: int) -> tuple[str, str]:
+        if (uid, gid) not in owner_names:
+            uname = gname = ""
+            if pwd is not None:
+                with contextlib.suppress(KeyError):
+                    uname = pwd.getpwuid(uid)[0]
+            if grp is not None:
+                with contextlib.suppress(KeyError):
+                    gname = grp.getgrgid(gid)[0]
+            owner_names[(uid, gid)] = (uname, gname)
+        return owner_names[(uid, gid)]
+
+    def add_entry(entry_path: str, entry_arcname: str, st: os.stat_result) -> None:
+        # Skip the archive itself, as tar.add does
+        if tar.name is not None and os.path.abspath(entry_path) == tar.name:
+            return
+
+        mode = st.st_mode
+        linkname = ""
+        if stat.S_ISREG(mode):
+            # Windows scandir leaves st_ino/st_nlink at 0; lstat for link detection
+            if not st.st_ino:
+                st = os.lstat(entry_path)
+            inode = (st.st_ino, st.st_dev)
+            if st.st_nlink > 1 and inode in tar.inodes and entry_arcname != tar.inodes[inode]:
+                member_type = tarfile.LNKTYPE
+                linkname = tar.inodes[inode]
+            else:
+                member_type = tarfile.REGTYPE
+                if inode[0]:
+                    tar.inodes[inode] = entry_arcname
+        elif stat.S_ISDIR(mode):
+            member_type = tarfile.DIRTYPE
+        elif stat.S_ISLNK(mode):
+            member_type = tarfile.SYMTYPE
+            linkname = os.readlink(entry_path)
+        else:
+            # FIFOs and device nodes: rare enough to leave to tarfile
+            tar.add(entry_path, arcname=entry_arcname, recursive=False, filter=filter)
+            return
+
+        tarinfo = tar.tarinfo(entry_arcname)
+        tarinfo.tarfile = tar
+        tarinfo.mode = mode
+        tarinfo.uid = st.st_uid
+        tarinfo.gid = st.st_gid
+        tarinfo.uname, tarinfo.gname = names_for(st.st_uid, st.st_gid)
+        tarinfo.size = st.st_size if member_type == tarfile.REGTYPE else 0
+        tarinfo.mtime = st.st_mtime
+        tarinfo.type = member_type
+        tarinfo.linkname = linkname
+
+        if filter is not None:
+            tarinfo = filter(tarinfo)
+            if tarinfo is None:
+                return
+
+        if tarinfo.isreg():
+            with open(entry_path, "rb") as f:
+                tar.addfile(tarinfo, f)
+        elif tarinfo.isdir():
+            tar.addfile(tarinfo)
+            with os.scandir(entry_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+            for entry in entries:
+                add_entry(entry.path, f"{entry_arcname}/{entry.name}", entry.stat(follow_symlinks=False))
+        else:
+            tar.addfile(tarinfo)
+
+    add_entry(path, arcname, os.lstat(path))
+
+
+def create_hardlink_structure(
+    manifest_path: Path | str,
+    canonical_dir: Path | str,
+    output_dir: Path | str,
+    link_canonical: bool = True,
+    verbose: bool = False,
+) -> Path:
     """
     Create directory structure with hard links based on manifest.
 
@@ -27,48 +211,76 @@ def create_hardlink_structure(manifest_path: Path | str, canonical_dir: Path | s
         manifest_path: Path to dedup_manifest.json
         canonical_dir: Directory containing canonical (unique) binaries
         output_dir: Output directory for hardlinked structure
+        link_canonical: Hard-link the canonical files themselves into the output
+            instead of copying them (falls back to a copy across filesystems)
+        verbose: Print every file as it is linked or copied
     """
     manifest_path = Path(manifest_path)
     canonical_dir = Path(canonical_dir)
     output_dir = Path(output_dir)
 
-    # Load manifest
-    with open(manifest_path) as f:
-        manifest_data = json.load(f)
-
-    manifest = manifest_data["manifest"]
+    # Load manifest (orjson, when installed, parses large manifests several
+    # times faster than the stdlib parser)
+    with open(manifest_path, "rb") as f:
+        raw = f.read()
+    manifest = (orjson.loads(raw) if orjson is not None else json.loads(raw))["manifest"]
 
     # Create output bin directory
     bin_dir = output_dir / "bin"
     bin_dir.mkdir(parents=True, exist_ok=True)
 
-    # Track which canonical files we've copied
-    canonical_copied = {}
+    # Group entries by canonical file so all links to one canonical are made
+    # back to back, while its data is still hot in the page cache
+    groups = defaultdict(list)
+    for filename, canonical_name in manifest.items():
+        groups[canonical_name].append(filename)
 
-    # Process each file in manifest
-    for filename, canonical_name in sorted(manifest.items()):
-        src = canonical_dir / canonical_name
-        dst = bin_dir / filename
+    # Plain string paths in the loop below: building a Path per entry
+    # re-parses every segment, and os.link/os.unlink take strings directly
+    canonical_str = str(canonical_dir)
+    bin_str = str(bin_dir)
 
-        if not src.exists():
+    # Stat each canonical file once up front; many manifest entries share one
+    missing_canonical = {name for name in groups if not os.path.exists(f"{canonical_str}{os.sep}{name}")}
+
+    placed = 0
+    for canonical_name, filenames in sorted(groups.items()):
+        src = f"{canonical_str}{os.sep}{canonical_name}"
+
+        if canonical_name in missing_canonical:
             print(f"Warning: Canonical file not found: {src}")
             continue
 
-        # If this is the first time we're seeing this canonical file,
-        # copy it to the first destination
-        if canonical_name not in canonical_copied:
-            print(f"Copy:     {filename} <- {canonical_name}")
-            shutil.copy2(src, dst)
-            canonical_copied[canonical_name] = dst
+        # Place the canonical file at the first destination. A hard link to
+        # the canonical file avoids rewriting its bytes; tar_filter only
+        # rewrites member modes in the archive, so sharing the inode is safe
+        filenames.sort()
+        first_copy = f"{bin_str}{os.sep}{filenames[0]}"
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(first_copy)
+        if link_canonical:
+            if verbose:
+                print(f"Link:     {filenames[0]} <- {canonical_name}")
+            try:
+                os.link(src, first_copy)
+            except OSError as e:
+                print(f"  Warning: Hard link failed ({e}), using copy instead")
+                shutil.copy2(src, first_copy)
         else:
-            # Create hard link to the first copy
-            first_copy = canonical_copied[canonical_name]
-            print(f"Hardlink: {filename} -> {first_copy.name}")
+            if verbose:
+                print(f"Copy:     {filenames[0]} <- {canonical_name}")
+            shutil.copy2(src, first_copy)
+
+        # Create hard links to the first copy
+        for filename in filenames[1:]:
+            dst = f"{bin_str}{os.sep}{filename}"
+            if verbose:
+                print(f"Hardlink: {filename} -> {filenames[0]}")
 
             # On Windows, we need to use os.link
             # Remove dst if it exists
-            if dst.exists():
-                dst.unlink()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(dst)
 
             try:
                 os.link(first_copy, dst)
@@ -76,6 +288,10 @@ def create_hardlink_structure(manifest_path: Path | str, canonical_dir: Path | s
                 print(f"  Warning: Hard link failed ({e}), using copy instead")
                 shutil.copy2(src, dst)
 
+        placed += len(filenames)
+
+    print(f"Placed {placed} files from {len(groups) - len(missing_canonical)} canonical binaries in {bin_dir}")
+
     # Copy lib directory if it exists
     lib_src = canonical_dir.parent / "lib"
     if lib_src.exists():
@@ -96,17 +312,18 @@ def verify_hardlinks(bin_dir: Path | str) -> tuple[int, int]:
     print("VERIFYING HARD LINKS")
     print("=" * 70)
 
-    # Group files by inode
-    inode_to_files = {}
-
-    for exe_file in bin_dir.glob("*.exe"):
-        stat = exe_file.stat()
-        inode = stat.st_ino
-
-        if inode not in inode_to_files:
-            inode_to_files[inode] = []
+    # Group files by inode. scandir yields the entries straight from the
+    # directory read, so each file costs a single stat() and no glob matching
+    inode_to_files: dict[int, list[dict[str, str | int]]] = {}
 
-        inode_to_files[inode].append({"name": exe_file.name, "size": stat.st_size, "nlink": stat.st_nlink})
+    with os.scandir(bin_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".exe"):
+                continue
+            stat = entry.stat()
+            inode_to_files.setdefault(stat.st_ino, []).append(
+                {"name": entry.name, "size": stat.st_size, "nlink": stat.st_nlink}
+            )
 
     total_files = 0
     unique_inodes = 0
@@ -132,10 +349,14 @@ def verify_hardlinks(bin_dir: Path | str) -> tuple[int, int]:
     return total_files, unique_inodes
 
 
-def create_tar_archive(source_dir: Path | str, output_tar: Path | str, compression: str = "none") -> Path:
-    """Create tar archive (tar auto-detects hard links)."""
-    import tarfile
+def create_tar_archive(
+    source_dir: Path | str, output_tar: Path | str, compression: str = "none", verbose: bool = False
+) -> tuple[Path, list[tuple[str, int]]]:
+    """Create tar archive (tar auto-detects hard links).
 
+    Returns:
+        Tuple of (archive path, (name, mode) of every regular file member)
+    """
     source_dir = Path(source_dir)
     output_tar = Path(output_tar)
 
@@ -147,62 +368,45 @@ def create_tar_archive(source_dir: Path | str, output_tar: Path | str, compressi
     print(f"Compression: {compression}")
     print()
 
-    def tar_filter(tarinfo: tarfile.TarInfo) -> tarfile.TarInfo:
-        """Filter to set correct permissions for binaries and shared libraries."""
-        if tarinfo.isfile():
-            # Set executable permissions for files in main bin/ directory
-            if "/bin/" in tarinfo.name and "/lib/" not in tarinfo.name:
-                tarinfo.mode = 0o755  # rwxr-xr-x
-                print(f"  Setting executable: {tarinfo.name}")
-            # Set executable permissions for shared libraries and certain executables in lib/
-            elif "/lib/" in tarinfo.name:
-                # Headers, text files, and static libraries should be readable but not executable (check first)
-                if tarinfo.name.endswith((".h", ".inc", ".modulemap", ".tcc", ".txt", ".a", ".syms")):
-                    tarinfo.mode = 0o644  # rw-r--r--
-                # Shared libraries (.so, .dylib) need executable permissions on Unix
-                elif tarinfo.name.endswith((".so", ".dylib")) or ".so." in tarinfo.name:
-                    tarinfo.mode = 0o755  # rwxr-xr-x for shared libraries
-                    print(f"  Setting executable (shared lib): {tarinfo.name}")
-                # Executable binaries in lib/clang/*/bin/ directories
-                elif "/bin/" in tarinfo.name and not tarinfo.name.endswith(
-                    (".h", ".inc", ".txt", ".a", ".so", ".dylib")
-                ):
-                    tarinfo.mode = 0o755  # rwxr-xr-x
-                    print(f"  Setting executable (lib binary): {tarinfo.name}")
-        return tarinfo
-
     print("Creating tar archive using Python tarfile module...")
     print("Setting executable permissions for binaries in bin/...")
 
-    # Map compression type to tarfile mode
+    # Map compression type to tarfile stream mode ("w|": forward-only writes,
+    # no seeks, so the 8 MB buffer can coalesce the 512-byte headers)
     if compression == "none":
-        mode = "w"
+        mode = "w|"
     elif compression == "gzip":
-        mode = "w:gz"
+        mode = "w|gz"
     elif compression == "xz":
-        mode = "w:xz"
+        mode = "w|xz"
     else:
         raise ValueError(f"Unknown compression: {compression}")
 
-    with tarfile.open(output_tar, mode) as tar:
-        tar.add(source_dir, arcname=source_dir.name, filter=tar_filter)
+    with (
+        open(output_tar, "wb", buffering=TAR_WRITE_BUFFER_SIZE) as ofh,
+        tarfile.open(output_tar, mode=mode, fileobj=ofh) as tar,
+    ):
+        member_modes: list[tuple[str, int]] = []
+        add_tree(tar, str(source_dir), source_dir.name, recording_tar_filter(member_modes, verbose))
 
     size = output_tar.stat().st_size
     print(f"Created: {output_tar} ({size / (1024*1024):.2f} MB)")
 
-    return output_tar
-
+    return output_tar, member_modes
 
-def verify_tar_permissions(tar_file: Path | str) -> int:
-    """Verify that binaries and shared libraries in the tar archive have correct permissions."""
-    import tarfile
 
-    tar_file = Path(tar_file)
+def verify_tar_permissions(member_modes: list[tuple[str, int]], verbose: bool = False) -> int:
+    """Verify that binaries and shared libraries in the tar archive have correct permissions.
 
+    Args:
+        member_modes: (name, mode) of every regular file member, as recorded
+            while the archive was written (see recording_tar_filter)
+        verbose: Also print a sample of the members that passed
+    """
     print("\n" + "=" * 70)
     print("VERIFYING TAR PERMISSIONS")
     print("=" * 70)
-    print(f"Checking permissions in: {tar_file}")
+    print(f"Checking permissions of {len(member_modes)} archived files")
     print()
 
     issues_found = []
@@ -210,50 +414,44 @@ def verify_tar_permissions(tar_file: Path | str) -> int:
     libs_checked = 0
     headers_checked = 0
 
-    with tarfile.open(tar_file, "r") as tar:
-        for member in tar.getmembers():
-            if not member.isfile():
-                continue
-
-            # Check files in bin/ directory - should all be executable
-            if "/bin/" in member.name:
+    for name, mode in member_modes:
+        # Check files in bin/ directory - should all be executable
+        if "/bin/" in name:
+            binaries_checked += 1
+            # Check if executable bit is set (0o100 for user execute)
+            if not (mode & 0o100):
+                issues_found.append((name, oct(mode), "binary missing executable"))
+                print(f"  ✗ Missing executable permission: {name} (mode: {oct(mode)})")
+            else:
+                # Only print every 10th binary to avoid spam
+                if verbose and binaries_checked % 10 == 1:
+                    print(f"  ✓ bin: {name} (mode: {oct(mode)})")
+
+        # Check files in lib/ directory
+        elif "/lib/" in name:
+            # Headers and static libraries should NOT be executable (check this first)
+            if name.endswith((".h", ".inc", ".modulemap", ".tcc", ".txt", ".a", ".syms")):
+                headers_checked += 1
+                if mode & 0o100:
+                    issues_found.append((name, oct(mode), "header/static lib has executable bit"))
+                    print(f"  ✗ Header/static lib should not be executable: {name} (mode: {oct(mode)})")
+
+            # Shared libraries (.so, .dylib) should be executable
+            elif name.endswith((".so", ".dylib")) or ".so." in name:
+                libs_checked += 1
+                if not (mode & 0o100):
+                    issues_found.append((name, oct(mode), "shared lib missing executable"))
+                    print(f"  ✗ Shared lib missing executable: {name} (mode: {oct(mode)})")
+                elif verbose and libs_checked % 10 == 1:
+                    print(f"  ✓ lib: {name} (mode: {oct(mode)})")
+
+            # Executable binaries in lib/ (like *symbolize) - must be files without common extensions
+            # These are typically in lib/clang/*/bin/ directories
+            elif "/bin/" in name and not name.endswith((".h", ".inc", ".txt", ".a", ".so", ".dylib")):
                 binaries_checked += 1
-                # Check if executable bit is set (0o100 for user execute)
-                if not (member.mode & 0o100):
-                    issues_found.append((member.name, oct(member.mode), "binary missing executable"))
-                    print(f"  ✗ Missing executable permission: {member.name} (mode: {oct(member.mode)})")
-                else:
-                    # Only print every 10th binary to avoid spam
-                    if binaries_checked % 10 == 1:
-                        print(f"  ✓ bin: {member.name} (mode: {oct(member.mode)})")
-
-            # Check files in lib/ directory
-            elif "/lib/" in member.name:
-                # Headers and static libraries should NOT be executable (check this first)
-                if member.name.endswith((".h", ".inc", ".modulemap", ".tcc", ".txt", ".a", ".syms")):
-                    headers_checked += 1
-                    if member.mode & 0o100:
-                        issues_found.append((member.name, oct(member.mode), "header/static lib has executable bit"))
-                        print(
-                            f"  ✗ Header/static lib should not be executable: {member.name} (mode: {oct(member.mode)})"
-                        )
-
-                # Shared libraries (.so, .dylib) should be executable
-                elif member.name.endswith((".so", ".dylib")) or ".so." in member.name:
-                    libs_checked += 1
-                    if not (member.mode & 0o100):
-                        issues_found.append((member.name, oct(member.mode), "shared lib missing executable"))
-                        print(f"  ✗ Shared lib missing executable: {member.name} (mode: {oct(member.mode)})")
-                    elif libs_checked % 10 == 1:
-                        print(f"  ✓ lib: {member.name} (mode: {oct(member.mode)})")
-
-                # Executable binaries in lib/ (like *symbolize) - must be files without common extensions
-                # These are typically in lib/clang/*/bin/ directories
-                elif "/bin/" in member.name and not member.name.endswith((".h", ".inc", ".txt", ".a", ".so", ".dylib")):
-                    binaries_checked += 1
-                    if not (member.mode & 0o100):
-                        issues_found.append((member.name, oct(member.mode), "lib binary missing executable"))
-                        print(f"  ✗ Lib binary missing executable: {member.name} (mode: {oct(member.mode)})")
+                if not (mode & 0o100):
+                    issues_found.append((name, oct(mode), "lib binary missing executable"))
+                    print(f"  ✗ Lib binary missing executable: {name} (mode: {oct(mode)})")
 
     print()
     print(f"Total binaries checked: {binaries_checked}")
@@ -263,8 +461,8 @@ def verify_tar_permissions(tar_file: Path | str) -> int:
     if issues_found:
         print(f"\n⚠️  WARNING: Found {len(issues_found)} files with incorrect permissions!")
         print("\nFiles with issues:")
-        for name, mode, issue in issues_found:
-            print(f"  - {name} (mode: {mode}) - {issue}")
+        for name, mode_str, issue in issues_found:
+            print(f"  - {name} (mode: {mode_str}) - {issue}")
         print("\nThese files may not work correctly when extracted on Unix systems.")
         raise RuntimeError(f"Tar archive has {len(issues_found)} files with incorrect permissions")
     else:
@@ -273,41 +471,39 @@ def verify_tar_permissions(tar_file: Path | str) -> int:
     return binaries_checked + libs_checked
 
 
-def compress_with_zstd(tar_file: Path | str, output_zst: Path | str, level: int = 22) -> Path:
-    """Compress tar with zstd."""
-    import zstandard as zstd
+def compress_tar_stream(
+    source_dir: Path | str, output_zst: Path | str, level: int = DEFAULT_ZSTD_LEVEL, verbose: bool = False
+) -> tuple[Path, list[tuple[str, int]]]:
+    """Tar source_dir straight into a zstd stream, without an intermediate .tar file.
 
-    tar_file = Path(tar_file)
+    Returns:
+        Tuple of (archive path, (name, mode) of every regular file member)
+    """
+    source_dir = Path(source_dir)
     output_zst = Path(output_zst)
 
     print("\n" + "=" * 70)
-    print(f"COMPRESSING WITH ZSTD LEVEL {level}")
+    print(f"CREATING TAR.ZST ARCHIVE (ZSTD LEVEL {level})")
     print("=" * 70)
-    print(f"Input:  {tar_file} ({tar_file.stat().st_size / (1024*1024):.2f} MB)")
+    print(f"Source: {source_dir}")
     print(f"Output: {output_zst}")
     print()
 
-    # Read tar file
-    with open(tar_file, "rb") as f:
-        tar_data = f.read()
-
-    print(f"Compressing {len(tar_data) / (1024*1024):.1f} MB...")
-
-    # Compress with zstd
-    import time
+    print("Streaming tar into zstd (this may take a while)...")
+    print("Setting executable permissions for binaries in bin/...")
 
     start = time.time()
-    cctx = zstd.ZstdCompressor(level=level, threads=-1)
-    compressed = cctx.compress(tar_data)
+    cctx = zstd_compressor(level)
+    member_modes: list[tuple[str, int]] = []
+    with open(output_zst, "wb") as ofh, cctx.stream_writer(ofh) as writer:
+        # "w|" writes strictly forward, as a compressor stream requires
+        with tarfile.open(fileobj=writer, mode="w|") as tar:
+            add_tree(tar, str(source_dir), source_dir.name, recording_tar_filter(member_modes, verbose))
+        original_size = tar.offset
     elapsed = time.time() - start
 
-    # Write compressed file
-    with open(output_zst, "wb") as f:
-        f.write(compressed)
-
-    original_size = len(tar_data)
-    compressed_size = len(compressed)
-    ratio = original_size / compressed_size
+    compressed_size = output_zst.stat().st_size
+    ratio = original_size / compressed_size if compressed_size > 0 else 0
 
     print(f"Compressed in {elapsed:.1f}s")
     print(f"Original:   {original_size / (1024*1024):.2f} MB")
@@ -315,7 +511,7 @@ def compress_with_zstd(tar_file: Path | str, output_zst: Path | str, level: int
     print(f"Ratio:      {ratio:.2f}:1")
     print(f"Reduction:  {(1 - compressed_size/original_size) * 100:.1f}%")
 
-    return output_zst
+    return output_zst, member_modes
 
 
 def main() -> None:
@@ -325,7 +521,18 @@ def main() -> None:
     parser.add_argument("deduped_dir", help="Directory containing deduplicated structure")
     parser.add_argument("output_dir", help="Output directory for archive")
     parser.add_argument("--name", default="win_binaries", help="Archive base name")
-    parser.add_argument("--zstd-level", type=int, default=22, help="Zstd compression level (default: 22)")
+    parser.add_argument(
+        "--zstd-level",
+        type=int,
+        default=DEFAULT_ZSTD_LEVEL,
+        help=f"Zstd compression level (default: {DEFAULT_ZSTD_LEVEL})",
+    )
+    parser.add_argument(
+        "--no-link-canonical",
+        action="store_true",
+        help="Copy canonical binaries into the output instead of hard-linking them",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Print every file as it is linked and archived")
 
     args = parser.parse_args()
 
@@ -354,26 +561,26 @@ def main() -> None:
     print()
 
     hardlink_dir = output_dir / "win_hardlinked"
-    bin_dir = create_hardlink_structure(manifest_path, canonical_dir, hardlink_dir)
+    bin_dir = create_hardlink_structure(
+        manifest_path,
+        canonical_dir,
+        hardlink_dir,
+        link_canonical=not args.no_link_canonical,
+        verbose=args.verbose,
+    )
 
     # Step 2: Verify hardlinks
     _ = verify_hardlinks(bin_dir)  # Returns tuple but we don't need the values
 
-    # Step 3: Create tar archive
-    tar_file = output_dir / f"{args.name}.tar"
-    create_tar_archive(hardlink_dir, tar_file)
-
-    # Step 3.5: Verify tar permissions
-    verify_tar_permissions(tar_file)
-
-    # Step 4: Compress with zstd
+    # Step 3: Create tar archive, compressed with zstd as it is written
     try:
         zst_file = output_dir / f"{args.name}.tar.zst"
-        compress_with_zstd(tar_file, zst_file, level=args.zstd_level)
+        _, member_modes = compress_tar_stream(
+            hardlink_dir, zst_file, level=args.zstd_level, verbose=args.verbose
+        )
 
-        # Clean up uncompressed tar
-        print(f"\nRemoving uncompressed tar: {tar_file}")
-        tar_file.unlink()
+        # Step 3.5: Verify tar permissions (modes recorded while writing)
+        verify_tar_permissions(member_modes, verbose=args.verbose)
 
         print("\n" + "=" * 70)
         print("SUCCESS!")
@@ -383,6 +590,9 @@ def main() -> None:
 
     except ImportError:
         print("\nWarning: zstandard module not available")
+        tar_file = output_dir / f"{args.name}.tar"
+        _, member_modes = create_tar_archive(hardlink_dir, tar_file, verbose=args.verbose)
+        verify_tar_permissions(member_modes, verbose=args.verbose)
         print(f"Tar archive created: {tar_file}")
 
 
@@ -5,19 +5,70 @@ Create IWYU archives for all platforms.
 This script:
 1. Scans downloads-bins/assets/iwyu/ for extracted binaries
 2. Creates tar archives with proper permissions
-3. Compresses with zstd level 22
+3. Compresses with zstd level 19 plus long-distance matching
 4. Generates SHA256 checksums
 5. Outputs archives to downloads-bins/assets/iwyu/{platform}/{arch}/
 
 Unlike the Clang toolchain, IWYU has no duplicate binaries, so no deduplication is needed.
 """
 
-import hashlib
 import json
+import os
 import sys
 import tarfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+try:
+    from .zstd_utils import DEFAULT_ZSTD_LEVEL, HashingWriter, zstd_compressor
+except ImportError:
+    from zstd_utils import DEFAULT_ZSTD_LEVEL, HashingWriter, zstd_compressor
+
+# Buffer size for writing tar archives
+TAR_WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Buffer size for the sequential header scan in verify_tar_permissions
+VERIFY_READ_BUFFER_SIZE = 1024 * 1024
+
+# File extensions (text after the last ".") that tar_filter marks executable in bin/
+EXECUTABLE_SUFFIXES = frozenset({"py", "exe"})
+
+
+def tar_filter(tarinfo: tarfile.TarInfo) -> tarfile.TarInfo:
+    """Filter to set correct permissions for IWYU files."""
+    if tarinfo.isfile():
+        # Split once: directory components ("bin/" prefix or "/bin/" <=>
+        # "bin" in dirs) and the extension, instead of repeated scans
+        name = tarinfo.name
+        parts = name.split("/")
+        dirs = parts[:-1]
+        basename = parts[-1]
+        _, dot, suffix = basename.rpartition(".")
+        if not dot:
+            suffix = ""
+
+        # Python scripts and the main binary should be executable
+        if "bin" in dirs:
+            if suffix in EXECUTABLE_SUFFIXES or basename.endswith("include-what-you-use"):
+                tarinfo.mode = 0o755  # rwxr-xr-x
+                print(f"  Setting executable: {name}")
+            else:
+                # Other files in bin/ default to readable
+                tarinfo.mode = 0o644  # rw-r--r--
+        # Mapping files and other share/ content should be readable
+        elif "share" in dirs:
+            tarinfo.mode = 0o644  # rw-r--r--
+        # Shared libraries in lib/ should be readable and executable
+        elif "lib" in dirs:
+            if suffix == "so" or ".so." in name:
+                tarinfo.mode = 0o755  # rwxr-xr-x (shared libraries need execute permission)
+            else:
+                tarinfo.mode = 0o644  # rw-r--r--
+        # Other files (LICENSE, README, etc.)
+        else:
+            tarinfo.mode = 0o644  # rw-r--r--
+    return tarinfo
+
 
 def create_tar_archive(source_dir: Path, output_tar: Path) -> Path:
     """
@@ -37,37 +88,17 @@ def create_tar_archive(source_dir: Path, output_tar: Path) -> Path:
     print(f"Output: {output_tar}")
     print()
 
-    def tar_filter(tarinfo: tarfile.TarInfo) -> tarfile.TarInfo:
-        """Filter to set correct permissions for IWYU files."""
-        if tarinfo.isfile():
-            # Python scripts and the main binary should be executable
-            if "/bin/" in tarinfo.name or tarinfo.name.startswith("bin/"):
-                if tarinfo.name.endswith((".py", "include-what-you-use", ".exe")):
-                    tarinfo.mode = 0o755  # rwxr-xr-x
-                    print(f"  Setting executable: {tarinfo.name}")
-                else:
-                    # Other files in bin/ default to readable
-                    tarinfo.mode = 0o644  # rw-r--r--
-            # Mapping files and other share/ content should be readable
-            elif "/share/" in tarinfo.name or tarinfo.name.startswith("share/"):
-                tarinfo.mode = 0o644  # rw-r--r--
-            # Shared libraries in lib/ should be readable and executable
-            elif "/lib/" in tarinfo.name or tarinfo.name.startswith("lib/"):
-                if tarinfo.name.endswith(".so") or ".so." in tarinfo.name:
-                    tarinfo.mode = 0o755  # rwxr-xr-x (shared libraries need execute permission)
-                else:
-                    tarinfo.mode = 0o644  # rw-r--r--
-            # Other files (LICENSE, README, etc.)
-            else:
-                tarinfo.mode = 0o644  # rw-r--r--
-        return tarinfo
-
     print("Creating tar archive...")
     print("Setting permissions...")
 
     # Get the architecture directory name (x86_64, arm64)
     # We want the archive structure to be flat: bin/, lib/, share/, etc.
-    with tarfile.open(output_tar, "w") as tar:
+    # "w|" streams forward-only (no seeks), letting the 8 MB buffer coalesce
+    # tarfile's 512-byte header writes
+    with (
+        open(output_tar, "wb", buffering=TAR_WRITE_BUFFER_SIZE) as ofh,
+        tarfile.open(output_tar, mode="w|", fileobj=ofh) as tar,
+    ):
         # Add bin/ directory
         bin_dir = source_dir / "bin"
         if bin_dir.exists():
@@ -106,8 +137,14 @@ def verify_tar_permissions(tar_file: Path) -> int:
     executables_checked = 0
     data_files_checked = 0
 
-    with tarfile.open(tar_file, "r") as tar:
-        for member in tar.getmembers():
+    # "r|" reads headers strictly forward and skips file data in the same
+    # sequential pass; the 1 MB buffer keeps that to a few large reads.
+    # Problems are collected and reported once, after the scan
+    with (
+        open(tar_file, "rb", buffering=VERIFY_READ_BUFFER_SIZE) as ifh,
+        tarfile.open(fileobj=ifh, mode="r|") as tar,
+    ):
+        for member in tar:
             if not member.isfile():
                 continue
 
@@ -118,9 +155,6 @@ def verify_tar_permissions(tar_file: Path) -> int:
                     executables_checked += 1
                     if not (member.mode & 0o100):
                         issues_found.append((member.name, oct(member.mode), "executable missing +x"))
-                        print(f"  ✗ Missing executable permission: {member.name} (mode: {oct(member.mode)})")
-                    else:
-                        print(f"  ✓ bin: {member.name} (mode: {oct(member.mode)})")
 
             # Check files in share/ directory
             elif "/share/" in member.name or member.name.startswith("share/"):
@@ -128,9 +162,7 @@ def verify_tar_permissions(tar_file: Path) -> int:
                 # These should NOT be executable
                 if member.mode & 0o100:
                     issues_found.append((member.name, oct(member.mode), "data file has +x"))
-                    print(f"  ✗ Data file should not be executable: {member.name} (mode: {oct(member.mode)})")
 
-    print()
     print(f"Total executables checked: {executables_checked}")
     print(f"Total data files checked: {data_files_checked}")
 
@@ -146,14 +178,26 @@ def verify_tar_permissions(tar_file: Path) -> int:
     return executables_checked + data_files_checked
 
 
-def compress_with_zstd(tar_file: Path, output_zst: Path, level: int = 22) -> Path:
-    """Compress tar with zstd."""
-    import zstandard as zstd
+def compress_with_zstd(
+    tar_file: Path, output_zst: Path, level: int = DEFAULT_ZSTD_LEVEL, threads: int = -1
+) -> tuple[Path, str]:
+    """Compress tar with zstd.
+
+    Args:
+        tar_file: Tar archive to compress
+        output_zst: Output .tar.zst path
+        level: Zstd compression level
+        threads: Zstd worker threads (-1 = one per CPU)
+
+    Returns:
+        Tuple of (output path, SHA256 of the compressed archive)
+    """
+    tar_size = tar_file.stat().st_size
 
     print("\n" + "=" * 70)
     print(f"COMPRESSING WITH ZSTD LEVEL {level}")
     print("=" * 70)
-    print(f"Input:  {tar_file} ({tar_file.stat().st_size / (1024*1024):.2f} MB)")
+    print(f"Input:  {tar_file} ({tar_size / (1024*1024):.2f} MB)")
     print(f"Output: {output_zst}")
     print()
 
@@ -164,25 +208,24 @@ def compress_with_zstd(tar_file: Path, output_zst: Path, level: int = 22) -> Pat
 
     start = time.time()
 
-    # Create compressor with multi-threading
-    cctx = zstd.ZstdCompressor(level=level, threads=-1)
+    cctx = zstd_compressor(level, source_size=tar_size, threads=threads)
 
-    # Stream compress
+    # Stream compress; copy_stream runs the read/compress/write loop in C.
+    # The compressed bytes are hashed on their way to disk, so the checksum
+    # needs no second read of the archive
     with open(tar_file, "rb") as ifh, open(output_zst, "wb") as ofh:
-        # Read in chunks to allow interruption
-        chunk_size = 1024 * 1024  # 1MB chunks
-        reader = cctx.stream_reader(ifh, size=tar_file.stat().st_size)
-
-        while True:
-            chunk = reader.read(chunk_size)
-            if not chunk:
-                break
-            ofh.write(chunk)
+        writer = HashingWriter(ofh)
+        _, compressed_size = cctx.copy_stream(
+            ifh,
+            writer,
+            size=tar_size,
+            read_size=8 * 1024 * 1024,
+            write_size=8 * 1024 * 1024,
+        )
 
     elapsed = time.time() - start
 
-    original_size = tar_file.stat().st_size
-    compressed_size = output_zst.stat().st_size
+    original_size = tar_size
     ratio = original_size / compressed_size if compressed_size > 0 else 0
 
     print(f"Compressed in {elapsed:.1f}s")
@@ -191,22 +234,18 @@ def compress_with_zstd(tar_file: Path, output_zst: Path, level: int = 22) -> Pat
     print(f"Ratio:      {ratio:.2f}:1")
     print(f"Reduction:  {(1 - compressed_size/original_size) * 100:.1f}%")
 
-    return output_zst
-
-
-def generate_checksum(file_path: Path) -> str:
-    """Generate SHA256 checksum for a file."""
-    sha256_hash = hashlib.sha256()
-
-    with open(file_path, "rb") as f:
-        # Read in chunks to handle large files
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
+    return output_zst, writer.hexdigest()
 
-    return sha256_hash.hexdigest()
 
-
-def process_platform_arch(iwyu_root: Path, platform: str, arch: str, version: str) -> dict[str, str | int] | None:
+def process_platform_arch(
+    iwyu_root: Path,
+    platform: str,
+    arch: str,
+    version: str,
+    level: int = DEFAULT_ZSTD_LEVEL,
+    threads: int = -1,
+    verify: bool = False,
+) -> dict[str, str | int] | None:
     """
     Process a single platform/arch combination.
 
@@ -215,6 +254,10 @@ def process_platform_arch(iwyu_root: Path, platform: str, arch: str, version: st
         platform: Platform name (win, linux, darwin)
         arch: Architecture (x86_64, arm64)
         version: IWYU version (e.g., "0.25")
+        level: Zstd compression level
+        threads: Zstd worker threads (-1 = one per CPU)
+        verify: Re-read the tar and check member permissions (tar_filter
+            is covered by unit tests, so this is off by default)
 
     Returns:
         Dict with archive info, or None if skipped
@@ -239,15 +282,14 @@ def process_platform_arch(iwyu_root: Path, platform: str, arch: str, version: st
     create_tar_archive(source_dir, tar_file)
 
     # Step 2: Verify permissions
-    verify_tar_permissions(tar_file)
+    if verify:
+        verify_tar_permissions(tar_file)
 
-    # Step 3: Compress with zstd
-    compress_with_zstd(tar_file, zst_file)
+    # Step 3: Compress with zstd (SHA256 is computed as the archive is written)
+    _, sha256 = compress_with_zstd(tar_file, zst_file, level=level, threads=threads)
 
-    # Step 4: Generate checksum
-    print("\nGenerating SHA256 checksum...")
-    sha256 = generate_checksum(zst_file)
-    print(f"SHA256: {sha256}")
+    # Step 4: Record checksum
+    print(f"\nSHA256: {sha256}")
 
     # Write checksum file
     checksum_file = zst_file.with_suffix(".tar.zst.sha256")
@@ -283,11 +325,19 @@ def main() -> None:
         help="Root IWYU directory (default: downloads-bins/assets/iwyu)",
     )
     parser.add_argument("--version", default="0.25", help="IWYU version (default: 0.25)")
-    parser.add_argument("--zstd-level", type=int, default=22, help="Zstd compression level (default: 22)")
+    parser.add_argument(
+        "--zstd-level",
+        type=int,
+        default=DEFAULT_ZSTD_LEVEL,
+        help=f"Zstd compression level (default: {DEFAULT_ZSTD_LEVEL})",
+    )
     parser.add_argument(
         "--platform", help="Process only this platform (win, linux, darwin). If not specified, process all."
     )
     parser.add_argument("--arch", help="Process only this architecture (x86_64, arm64). If not specified, process all.")
+    parser.add_argument(
+        "--verify", action="store_true", help="Re-read each tar and verify member permissions before compressing"
+    )
 
     args = parser.parse_args()
 
@@ -301,12 +351,30 @@ def main() -> None:
     platforms = [args.platform] if args.platform else ["win", "linux", "darwin"]
     architectures = [args.arch] if args.arch else ["x86_64", "arm64"]
 
-    # Process each platform/arch combination
-    results = {}
-    for platform in platforms:
-        results[platform] = {}
-        for arch in architectures:
-            result = process_platform_arch(iwyu_root, platform, arch, args.version)
+    # Process platform/arch combinations in parallel - each one works in its
+    # own directory. Split the CPUs between workers so zstd doesn't oversubscribe.
+    combinations = [(platform, arch) for platform in platforms for arch in architectures]
+    cpu_count = os.cpu_count() or 1
+    max_workers = max(1, min(len(combinations), cpu_count))
+    threads = max(1, cpu_count // max_workers)
+
+    results = {platform: {} for platform in platforms}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            (platform, arch): executor.submit(
+                process_platform_arch,
+                iwyu_root,
+                platform,
+                arch,
+                args.version,
+                args.zstd_level,
+                threads,
+                args.verify,
+            )
+            for platform, arch in combinations
+        }
+        for (platform, arch), future in futures.items():
+            result = future.result()
             if result:
                 results[platform][arch] = result
 
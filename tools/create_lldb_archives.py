@@ -6,7 +6,7 @@ This script:
 1. Extracts LLDB binaries from official LLVM releases or existing extracted directories
 2. Filters to essential LLDB components (lldb, lldb-server, lldb-argdumper)
 3. Creates tar archives with proper permissions
-4. Compresses with zstd level 22
+4. Compresses with zstd level 19 plus long-distance matching
 5. Generates SHA256 checksums
 6. Outputs archives to downloads-bins/assets/lldb/{platform}/{arch}/
 
@@ -18,6 +18,7 @@ LLDB binaries to package:
 Unlike the Clang toolchain, LLDB has minimal binaries, so no deduplication is needed.
 """
 
+import contextlib
 import hashlib
 import json
 import os
@@ -25,8 +26,16 @@ import shutil
 import subprocess
 import sys
 import tarfile
+import urllib.error
 import urllib.request
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Any
+
+try:
+    from .zstd_utils import DEFAULT_ZSTD_LEVEL, HashingWriter, zstd_compressor
+except ImportError:
+    from zstd_utils import DEFAULT_ZSTD_LEVEL, HashingWriter, zstd_compressor
 
 # LLDB binaries to extract and package
 LLDB_BINARIES = {
@@ -43,6 +52,21 @@ LLDB_SUPPORT_FILES = {
     "python310.dll",  # Python 3.10 runtime (required by liblldb for scripting support)
 }
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# tarfile's block size when streaming to or from zstd
+TAR_STREAM_BUFSIZE = 1024 * 1024
+
+# Read size for generate_checksum on Pythons without hashlib.file_digest
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+# Build record kept in the work directory: archive size/mtime and the
+# parameters it was built with, for the up-to-date check
+BUILD_INFO_SUFFIX = ".build.json"
+
+# Platform/arch builds to run at once; each already runs a multi-threaded zstd
+DEFAULT_JOBS = 2
+
 # LLVM versions for each platform (from CLAUDE.md)
 LLVM_VERSIONS = {
     "win": "21.1.5",
@@ -83,6 +107,11 @@ def download_llvm_if_needed(platform: str, arch: str, version: str, work_dir: Pa
     """
     Download LLVM release if not already present.
 
+    Streams into <archive>.part and renames it into place once complete, so
+    an interrupted download is resumed with an HTTP Range request on the
+    next run. If-Range (with the ETag recorded next to the partial file)
+    makes the server send the full body instead if the release changed.
+
     Args:
         platform: Platform name (win, linux, darwin)
         arch: Architecture (x86_64, arm64)
@@ -104,6 +133,9 @@ def download_llvm_if_needed(platform: str, arch: str, version: str, work_dir: Pa
         print(f"[OK] LLVM archive already exists: {download_path}")
         return download_path
 
+    partial = download_path.with_name(filename + ".part")
+    etag_file = download_path.with_name(filename + ".part.etag")
+
     print(f"Downloading LLVM {version} for {platform}/{arch}...")
     print(f"URL: {url}")
     print(f"Destination: {download_path}")
@@ -111,29 +143,74 @@ def download_llvm_if_needed(platform: str, arch: str, version: str, work_dir: Pa
 
     work_dir.mkdir(parents=True, exist_ok=True)
 
-    def show_progress(block_num: int, block_size: int, total_size: int) -> None:
+    def show_progress(downloaded: int, total_size: int) -> None:
         if total_size > 0:
-            downloaded = block_num * block_size
             percent = min(100, (downloaded / total_size) * 100)
             mb_downloaded = downloaded / (1024 * 1024)
             mb_total = total_size / (1024 * 1024)
             print(f"\rProgress: {percent:5.1f}% ({mb_downloaded:6.1f} MB / {mb_total:6.1f} MB)", end="", flush=True)
 
+    headers = {}
+    resume_from = partial.stat().st_size if partial.exists() else 0
+    if resume_from:
+        print(f"Resuming from {resume_from / (1024 * 1024):.2f} MB")
+        headers["Range"] = f"bytes={resume_from}-"
+        if etag_file.exists():
+            headers["If-Range"] = etag_file.read_text().strip()
+
     try:
-        urllib.request.urlretrieve(url, download_path, reporthook=show_progress)
+        try:
+            response = urllib.request.urlopen(urllib.request.Request(url, headers=headers))
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and resume_from:
+                print("[WARN] Cannot resume partial download - starting over")
+                partial.unlink()
+                return download_llvm_if_needed(platform, arch, version, work_dir)
+            raise
+
+        with response:
+            etag = response.headers.get("ETag")
+            if etag:
+                etag_file.write_text(etag + "\n")
+
+            # 206 continues the partial file; a 200 (no range support, or
+            # If-Range mismatch) carries the full body
+            downloaded = resume_from if response.status == 206 else 0
+            length = response.headers.get("Content-Length")
+            total_size = downloaded + int(length) if length else 0
+
+            with open(partial, "ab" if downloaded else "wb") as f:
+                while chunk := response.read(DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    show_progress(downloaded, total_size)
+
+        partial.replace(download_path)
+        etag_file.unlink(missing_ok=True)
         print()  # New line after progress
         print(f"[OK] Downloaded: {download_path.stat().st_size / (1024 * 1024):.2f} MB")
         return download_path
     except Exception as e:
-        if download_path.exists():
-            download_path.unlink()
+        # Keep the .part file: the next run resumes from it
         raise RuntimeError(f"Failed to download LLVM: {e}") from e
 
 
+def find_llvm_root(extract_dir: Path) -> Path | None:
+    """Return the directory under extract_dir that contains bin/, if any."""
+    for item in extract_dir.iterdir():
+        if item.is_dir() and (item / "bin").exists():
+            return item
+    return None
+
+
 def extract_llvm_archive(archive_path: Path, extract_dir: Path, platform: str) -> Path:
     """
     Extract LLVM archive.
 
+    A successful extraction leaves a .ok-<archive sha256> sentinel in
+    extract_dir; later runs against the same archive reuse the extracted
+    tree instead of decompressing it again.
+
     Args:
         archive_path: Path to LLVM archive
         extract_dir: Directory to extract to
@@ -142,8 +219,18 @@ def extract_llvm_archive(archive_path: Path, extract_dir: Path, platform: str) -
     Returns:
         Path to extracted LLVM root directory
     """
+    sentinel = extract_dir / f".ok-{generate_checksum(archive_path)}"
+    if sentinel.exists():
+        llvm_root = find_llvm_root(extract_dir)
+        if llvm_root:
+            print(f"\n[OK] LLVM archive already extracted: {llvm_root}")
+            return llvm_root
+
     print(f"\nExtracting LLVM archive: {archive_path}")
     extract_dir.mkdir(parents=True, exist_ok=True)
+    # Drop sentinels from a previous archive before touching the tree
+    for stale in extract_dir.glob(".ok-*"):
+        stale.unlink()
 
     if archive_path.suffix == ".exe":
         # Windows installer - need 7z
@@ -165,7 +252,27 @@ def extract_llvm_archive(archive_path: Path, extract_dir: Path, platform: str) -
         # Try external tar command first (faster)
         tar_available = shutil.which("tar") is not None
 
-        if tar_available:
+        if tar_available and shutil.which("xz"):
+            # tar -J runs xz single-threaded; xz 5.4+ decompresses the
+            # multi-block LLVM tarballs on all cores with -T0
+            print("Using multi-threaded xz piped into system tar...")
+            xz = subprocess.Popen(["xz", "-d", "-T0", "-c", str(archive_path)], stdout=subprocess.PIPE)
+            try:
+                subprocess.run(
+                    ["tar", "-xf", "-", "-C", str(extract_dir)],
+                    stdin=xz.stdout,
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                )
+            finally:
+                # Close our copy so xz gets SIGPIPE if tar exits early
+                xz.stdout.close()
+                returncode = xz.wait()
+
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, xz.args)
+        elif tar_available:
             print("Using system tar command...")
             subprocess.run(
                 ["tar", "-xJf", str(archive_path), "-C", str(extract_dir)],
@@ -187,15 +294,12 @@ def extract_llvm_archive(archive_path: Path, extract_dir: Path, platform: str) -
     print(f"[OK] Extracted to: {extract_dir}")
 
     # Find the LLVM root directory
-    llvm_root = None
-    for item in extract_dir.iterdir():
-        if item.is_dir() and (item / "bin").exists():
-            llvm_root = item
-            break
+    llvm_root = find_llvm_root(extract_dir)
 
     if not llvm_root:
         raise RuntimeError(f"Could not find LLVM root with bin/ directory in {extract_dir}")
 
+    sentinel.touch()
     print(f"[OK] Found LLVM root: {llvm_root}")
     return llvm_root
 
@@ -282,7 +386,7 @@ def copy_python_modules(python_dir: Path, output_dir: Path, platform: str = "win
     return file_count
 
 
-def extract_lldb_binaries(llvm_root: Path, output_dir: Path, platform: str) -> int:
+def extract_lldb_binaries(llvm_root: Path, output_dir: Path, platform: str, verbose: bool = False) -> int:
     """
     Extract LLDB binaries from LLVM installation.
 
@@ -290,6 +394,7 @@ def extract_lldb_binaries(llvm_root: Path, output_dir: Path, platform: str) -> i
         llvm_root: Root directory of extracted LLVM
         output_dir: Output directory for LLDB binaries
         platform: Platform name (win, linux, darwin)
+        verbose: Print every file as it is copied or found missing
 
     Returns:
         Number of binaries extracted
@@ -297,8 +402,13 @@ def extract_lldb_binaries(llvm_root: Path, output_dir: Path, platform: str) -> i
     print(f"\nExtracting LLDB binaries from: {llvm_root}")
 
     bin_dir = llvm_root / "bin"
-    if not bin_dir.exists():
-        raise RuntimeError(f"bin/ directory not found in {llvm_root}")
+    # One directory scan; DirEntry caches the type and stat results, so the
+    # lookups below don't stat each candidate again
+    try:
+        with os.scandir(bin_dir) as it:
+            bin_entries = {entry.name: entry for entry in it}
+    except FileNotFoundError:
+        raise RuntimeError(f"bin/ directory not found in {llvm_root}") from None
 
     output_bin = output_dir / "bin"
     output_bin.mkdir(parents=True, exist_ok=True)
@@ -307,33 +417,35 @@ def extract_lldb_binaries(llvm_root: Path, output_dir: Path, platform: str) -> i
     ext = ".exe" if platform == "win" else ""
 
     extracted_count = 0
-    print(f"\nLooking for LLDB binaries in: {bin_dir}")
-    print("Expected binaries:")
+    if verbose:
+        print(f"\nLooking for LLDB binaries in: {bin_dir}")
+        print("Expected binaries:")
 
     for binary_name in sorted(LLDB_BINARIES):
-        binary_file = bin_dir / f"{binary_name}{ext}"
+        binary_file = bin_entries.get(f"{binary_name}{ext}")
 
-        if binary_file.exists():
-            dest = output_bin / binary_file.name
-            shutil.copy2(binary_file, dest)
-            size_mb = dest.stat().st_size / (1024 * 1024)
-            print(f"  [OK] {binary_file.name:20s} ({size_mb:6.1f} MB)")
+        if binary_file:
+            shutil.copy2(binary_file.path, output_bin / binary_file.name)
+            if verbose:
+                size_mb = binary_file.stat().st_size / (1024 * 1024)
+                print(f"  [OK] {binary_file.name:20s} ({size_mb:6.1f} MB)")
             extracted_count += 1
-        else:
+        elif verbose:
             print(f"  [SKIP] {binary_name}{ext:4s} (not found - may be optional)")
 
     # Also copy support files (DLLs, shared libraries)
-    print("\nLooking for LLDB support files:")
+    if verbose:
+        print("\nLooking for LLDB support files:")
     for support_file in sorted(LLDB_SUPPORT_FILES):
-        support_path = bin_dir / support_file
+        support_path = bin_entries.get(support_file)
 
-        if support_path.exists():
-            dest = output_bin / support_path.name
-            shutil.copy2(support_path, dest)
-            size_mb = dest.stat().st_size / (1024 * 1024)
-            print(f"  [OK] {support_path.name:20s} ({size_mb:6.1f} MB)")
+        if support_path:
+            shutil.copy2(support_path.path, output_bin / support_path.name)
+            if verbose:
+                size_mb = support_path.stat().st_size / (1024 * 1024)
+                print(f"  [OK] {support_path.name:20s} ({size_mb:6.1f} MB)")
             extracted_count += 1
-        else:
+        elif verbose:
             # Support files are optional (platform-specific)
             print(f"  - {support_file:20s} (not found - platform-specific)")
 
@@ -347,19 +459,23 @@ def extract_lldb_binaries(llvm_root: Path, output_dir: Path, platform: str) -> i
             output_lib = output_dir / "lib"
             output_lib.mkdir(parents=True, exist_ok=True)
             print(f"\nCopying darwin liblldb* from: {src_lib}")
-            for entry in sorted(src_lib.glob("liblldb*")):
+            with os.scandir(src_lib) as it:
+                lib_entries = sorted((e for e in it if e.name.startswith("liblldb")), key=lambda e: e.name)
+            for entry in lib_entries:
                 dest = output_lib / entry.name
                 if entry.is_symlink():
-                    target = os.readlink(entry)
+                    target = os.readlink(entry.path)
                     if dest.exists() or dest.is_symlink():
                         dest.unlink()
                     os.symlink(target, dest)
-                    print(f"  [OK] {entry.name:35s} -> {target} (symlink)")
+                    if verbose:
+                        print(f"  [OK] {entry.name:35s} -> {target} (symlink)")
                     extracted_count += 1
                 elif entry.is_file():
-                    shutil.copy2(entry, dest)
-                    size_mb = dest.stat().st_size / (1024 * 1024)
-                    print(f"  [OK] {entry.name:35s} ({size_mb:6.1f} MB)")
+                    shutil.copy2(entry.path, dest)
+                    if verbose:
+                        size_mb = entry.stat().st_size / (1024 * 1024)
+                        print(f"  [OK] {entry.name:35s} ({size_mb:6.1f} MB)")
                     extracted_count += 1
 
     if extracted_count == 0:
@@ -369,85 +485,126 @@ def extract_lldb_binaries(llvm_root: Path, output_dir: Path, platform: str) -> i
     return extracted_count
 
 
-def create_tar_archive(source_dir: Path, output_tar: Path) -> Path:
+def tar_filter(tarinfo: tarfile.TarInfo) -> tarfile.TarInfo:
+    """Filter to set correct permissions for LLDB files."""
+    if tarinfo.isfile():
+        # All binaries in bin/ should be executable
+        if "/bin/" in tarinfo.name or tarinfo.name.startswith("bin/"):
+            tarinfo.mode = 0o755  # rwxr-xr-x
+        else:
+            # Other files default to readable
+            tarinfo.mode = 0o644  # rw-r--r--
+    return tarinfo
+
+
+def add_lldb_files(tar: tarfile.TarFile, source_dir: Path) -> None:
     """
-    Create tar archive with correct permissions for LLDB.
+    Add the LLDB archive layout (bin/, lib/, python/, top-level files) to an open tar.
 
     Args:
+        tar: Tar archive open for writing
         source_dir: Directory containing bin/ (e.g., lldb_extracted/)
-        output_tar: Output tar file path
+    """
+    # Add bin/ directory
+    bin_dir = source_dir / "bin"
+    if bin_dir.exists():
+        tar.add(bin_dir, arcname="bin", filter=tar_filter)
+
+    # Add lib/ directory (darwin liblldb*.dylib + symlink chain — see
+    # extract_lldb_binaries' darwin branch). tarfile preserves symlinks
+    # natively as link entries, so the symlink chain survives the archive.
+    lib_dir = source_dir / "lib"
+    if lib_dir.exists():
+        print("  Adding lib/ directory...")
+        tar.add(lib_dir, arcname="lib", filter=tar_filter)
+
+    # Add python/ directory (if exists - for LLDB with Python support)
+    python_dir = source_dir / "python"
+    if python_dir.exists():
+        print("  Adding python/ directory...")
+        tar.add(python_dir, arcname="python", filter=tar_filter)
+
+        # Windows only: Also copy Python files to bin/ directory for runtime access
+        # LLDB's Python looks for python310.zip in bin/ directory (where lldb.exe is)
+        python_zip = python_dir / "python310.zip"
+        if python_zip.exists():
+            print("  Also adding python310.zip to bin/ directory for Python sys.path...")
+            tar.add(python_zip, arcname="bin/python310.zip", filter=tar_filter)
+
+        # NEW: Also copy python310.dll to bin/ directory (required by liblldb.dll)
+        python_dll = python_dir / "python310.dll"
+        if python_dll.exists():
+            print("  Also adding python310.dll to bin/ directory for liblldb.dll...")
+            tar.add(python_dll, arcname="bin/python310.dll", filter=tar_filter)
+
+    # Add any other top-level files (LICENSE, README, etc.)
+    for item in source_dir.iterdir():
+        if item.is_file():
+            tar.add(item, arcname=item.name, filter=tar_filter)
+
+
+def create_tar_zst_archive(
+    source_dir: Path, output_zst: Path, level: int = DEFAULT_ZSTD_LEVEL, threads: int = -1
+) -> tuple[Path, str]:
+    """
+    Tar source_dir straight into a zstd stream, without an intermediate .tar file.
+
+    The compressed bytes are SHA-256 hashed on their way to disk, so the
+    archive never has to be read back for its checksum.
+
+    Args:
+        source_dir: Directory containing bin/ (e.g., lldb_extracted/)
+        output_zst: Output .tar.zst path
+        level: Zstd compression level
+        threads: Zstd worker threads (-1 = one per CPU)
 
     Returns:
-        Path to created tar file
+        Tuple of (path to created .tar.zst file, its SHA256 hex digest)
     """
+    import time
+
     print("\n" + "=" * 70)
-    print("CREATING TAR ARCHIVE")
+    print(f"CREATING TAR.ZST ARCHIVE (ZSTD LEVEL {level})")
     print("=" * 70)
     print(f"Source: {source_dir}")
-    print(f"Output: {output_tar}")
+    print(f"Output: {output_zst}")
     print()
 
-    def tar_filter(tarinfo: tarfile.TarInfo) -> tarfile.TarInfo:
-        """Filter to set correct permissions for LLDB files."""
-        if tarinfo.isfile():
-            # All binaries in bin/ should be executable
-            if "/bin/" in tarinfo.name or tarinfo.name.startswith("bin/"):
-                tarinfo.mode = 0o755  # rwxr-xr-x
-                print(f"  Setting executable: {tarinfo.name}")
-            else:
-                # Other files default to readable
-                tarinfo.mode = 0o644  # rw-r--r--
-        return tarinfo
-
-    print("Creating tar archive...")
+    print("Streaming tar into zstd (this may take a while)...")
     print("Setting permissions...")
 
-    with tarfile.open(output_tar, "w") as tar:
-        # Add bin/ directory
-        bin_dir = source_dir / "bin"
-        if bin_dir.exists():
-            tar.add(bin_dir, arcname="bin", filter=tar_filter)
-
-        # Add lib/ directory (darwin liblldb*.dylib + symlink chain — see
-        # extract_lldb_binaries' darwin branch). tarfile preserves symlinks
-        # natively as link entries, so the symlink chain survives the archive.
-        lib_dir = source_dir / "lib"
-        if lib_dir.exists():
-            print("  Adding lib/ directory...")
-            tar.add(lib_dir, arcname="lib", filter=tar_filter)
-
-        # Add python/ directory (if exists - for LLDB with Python support)
-        python_dir = source_dir / "python"
-        if python_dir.exists():
-            print("  Adding python/ directory...")
-            tar.add(python_dir, arcname="python", filter=tar_filter)
-
-            # Windows only: Also copy Python files to bin/ directory for runtime access
-            # LLDB's Python looks for python310.zip in bin/ directory (where lldb.exe is)
-            python_zip = python_dir / "python310.zip"
-            if python_zip.exists():
-                print("  Also adding python310.zip to bin/ directory for Python sys.path...")
-                tar.add(python_zip, arcname="bin/python310.zip", filter=tar_filter)
-
-            # NEW: Also copy python310.dll to bin/ directory (required by liblldb.dll)
-            python_dll = python_dir / "python310.dll"
-            if python_dll.exists():
-                print("  Also adding python310.dll to bin/ directory for liblldb.dll...")
-                tar.add(python_dll, arcname="bin/python310.dll", filter=tar_filter)
-
-        # Add any other top-level files (LICENSE, README, etc.)
-        for item in source_dir.iterdir():
-            if item.is_file():
-                tar.add(item, arcname=item.name, filter=tar_filter)
-
-    size = output_tar.stat().st_size
-    print(f"[OK] Created: {output_tar} ({size / (1024 * 1024):.2f} MB)")
-
-    return output_tar
+    start = time.time()
+
+    cctx = zstd_compressor(level, threads=threads)
+
+    with open(output_zst, "wb") as ofh:
+        hashing_ofh = HashingWriter(ofh)
+        with cctx.stream_writer(hashing_ofh) as writer:
+            # "w|" writes strictly forward, as a compressor stream requires; a
+            # large bufsize hands zstd 1 MB blocks instead of 10 KB records
+            with tarfile.open(fileobj=writer, mode="w|", bufsize=TAR_STREAM_BUFSIZE) as tar:
+                add_lldb_files(tar, source_dir)
+            original_size = tar.offset
+
+    elapsed = time.time() - start
+
+    compressed_size = output_zst.stat().st_size
+    ratio = original_size / compressed_size if compressed_size > 0 else 0
+
+    print(f"[OK] Compressed in {elapsed:.1f}s")
+    print(f"  Original:   {original_size / (1024 * 1024):.2f} MB")
+    print(f"  Compressed: {compressed_size / (1024 * 1024):.2f} MB")
+    print(f"  Ratio:      {ratio:.2f}:1")
+    print(f"  Reduction:  {(1 - compressed_size / original_size) * 100:.1f}%")
+
+    return output_zst, hashing_ofh.hexdigest()
 
 
 def verify_tar_permissions(tar_file: Path) -> int:
-    """Verify that files in the tar archive have correct permissions."""
+    """Verify that files in the tar archive have correct permissions.
+
+    Accepts a plain .tar or a .tar.zst (read as a stream, never decompressed to disk).
+    """
     print("\n" + "=" * 70)
     print("VERIFYING TAR PERMISSIONS")
     print("=" * 70)
@@ -457,8 +614,20 @@ def verify_tar_permissions(tar_file: Path) -> int:
     issues_found = []
     executables_checked = 0
 
-    with tarfile.open(tar_file, "r") as tar:
-        for member in tar.getmembers():
+    with contextlib.ExitStack() as stack:
+        if tar_file.suffix == ".zst":
+            import zstandard as zstd
+
+            # Decompress in 1 MB steps and let tarfile pull 1 MB blocks, so
+            # the check costs a handful of large reads rather than one
+            # Python-level call per 10 KB record
+            ifh = stack.enter_context(open(tar_file, "rb"))
+            reader = stack.enter_context(zstd.ZstdDecompressor().stream_reader(ifh, read_size=TAR_STREAM_BUFSIZE))
+            tar = stack.enter_context(tarfile.open(fileobj=reader, mode="r|", bufsize=TAR_STREAM_BUFSIZE))
+        else:
+            tar = stack.enter_context(tarfile.open(tar_file, "r"))
+
+        for member in tar:
             if not member.isfile():
                 continue
 
@@ -468,11 +637,8 @@ def verify_tar_permissions(tar_file: Path) -> int:
                 # Check if executable bit is set
                 if not (member.mode & 0o100):
                     issues_found.append((member.name, oct(member.mode), "executable missing +x"))
-                    print(f"  [WARN] Missing executable permission: {member.name} (mode: {oct(member.mode)})")
-                else:
-                    print(f"  [OK] {member.name} (mode: {oct(member.mode)})")
 
-    print()
+    # Problems are collected during the scan and reported once, below
     print(f"Total executables checked: {executables_checked}")
 
     if issues_found:
@@ -487,65 +653,31 @@ def verify_tar_permissions(tar_file: Path) -> int:
     return executables_checked
 
 
-def compress_with_zstd(tar_file: Path, output_zst: Path, level: int = 22) -> Path:
-    """Compress tar with zstd."""
-    import zstandard as zstd
-
-    print("\n" + "=" * 70)
-    print(f"COMPRESSING WITH ZSTD LEVEL {level}")
-    print("=" * 70)
-    print(f"Input:  {tar_file} ({tar_file.stat().st_size / (1024 * 1024):.2f} MB)")
-    print(f"Output: {output_zst}")
-    print()
-
-    print("Compressing (this may take a while)...")
-
-    import time
-
-    start = time.time()
-
-    # Create compressor with multi-threading
-    cctx = zstd.ZstdCompressor(level=level, threads=-1)
-
-    # Stream compress
-    with open(tar_file, "rb") as ifh, open(output_zst, "wb") as ofh:
-        # Read in chunks to allow interruption
-        chunk_size = 1024 * 1024  # 1MB chunks
-        reader = cctx.stream_reader(ifh, size=tar_file.stat().st_size)
-
-        while True:
-            chunk = reader.read(chunk_size)
-            if not chunk:
-                break
-            ofh.write(chunk)
-
-    elapsed = time.time() - start
-
-    original_size = tar_file.stat().st_size
-    compressed_size = output_zst.stat().st_size
-    ratio = original_size / compressed_size if compressed_size > 0 else 0
-
-    print(f"[OK] Compressed in {elapsed:.1f}s")
-    print(f"  Original:   {original_size / (1024 * 1024):.2f} MB")
-    print(f"  Compressed: {compressed_size / (1024 * 1024):.2f} MB")
-    print(f"  Ratio:      {ratio:.2f}:1")
-    print(f"  Reduction:  {(1 - compressed_size / original_size) * 100:.1f}%")
-
-    return output_zst
-
-
 def generate_checksum(file_path: Path) -> str:
     """Generate SHA256 checksum for a file."""
-    sha256_hash = hashlib.sha256()
-
-    with open(file_path, "rb") as f:
-        # Read in chunks to handle large files
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
+    with open(file_path, "rb", buffering=0) as f:
+        # file_digest (3.11+) runs the read/update loop in C with a large
+        # buffer and without the GIL
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+
+        # Older Pythons: reuse one buffer instead of allocating per chunk
+        sha256_hash = hashlib.sha256()
+        buffer = memoryview(bytearray(CHECKSUM_CHUNK_SIZE))
+        while n := f.readinto(buffer):
+            sha256_hash.update(buffer[:n])
 
     return sha256_hash.hexdigest()
 
 
+def read_build_info(build_info_file: Path) -> dict[str, Any]:
+    """Load the build record written next to the work directory, or {} if missing or unreadable."""
+    try:
+        return json.loads(build_info_file.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
 def process_platform_arch(
     lldb_root: Path,
     platform: str,
@@ -553,6 +685,11 @@ def process_platform_arch(
     version: str,
     source_dir: Path | None = None,
     python_dir: Path | None = None,
+    force: bool = False,
+    level: int = DEFAULT_ZSTD_LEVEL,
+    threads: int = -1,
+    verify: bool = False,
+    verbose: bool = False,
 ) -> dict[str, str | int] | None:
     """
     Process a single platform/arch combination.
@@ -564,11 +701,21 @@ def process_platform_arch(
         version: LLDB version (e.g., "21.1.5")
         source_dir: Optional existing LLVM extraction directory
         python_dir: Optional Python modules directory (for --with-python)
+        force: Rebuild even if the archive was already built with the same
+            parameters and has not changed since
+        level: Zstd compression level
+        threads: Zstd worker threads (-1 = one per CPU)
+        verify: Re-read the archive and check member permissions (tar_filter
+            already sets them, so this is only a paranoia check)
+        verbose: Print every LLDB file as it is extracted
 
     Returns:
         Dict with archive info, or None if skipped
     """
     output_dir = lldb_root / platform / arch
+    archive_base = f"lldb-{version}-{platform}-{arch}"
+    zst_file = output_dir / f"{archive_base}.tar.zst"
+    checksum_file = Path(str(zst_file) + ".sha256")
 
     print("\n" + "=" * 70)
     print(f"PROCESSING: {platform}/{arch} (LLVM {version})")
@@ -578,6 +725,32 @@ def process_platform_arch(
     work_dir = lldb_root.parent.parent / "work" / "lldb" / platform / arch
     work_dir.mkdir(parents=True, exist_ok=True)
 
+    # The archive name pins the LLVM version; the build record pins the
+    # other inputs and the archive's size/mtime as written. If all match,
+    # skip download, extraction and compression without re-hashing
+    build_info_file = work_dir / f"{archive_base}{BUILD_INFO_SUFFIX}"
+    build_params = {
+        "zstd_level": level,
+        "source_dir": str(source_dir.resolve()) if source_dir else None,
+        "python_dir": str(python_dir.resolve()) if python_dir else None,
+    }
+    if not force and zst_file.exists() and checksum_file.exists():
+        build_info = read_build_info(build_info_file)
+        st = zst_file.stat()
+        if (
+            build_info.get("params") == build_params
+            and build_info.get("size") == st.st_size
+            and build_info.get("mtime_ns") == st.st_mtime_ns
+        ):
+            print(f"\n[OK] Archive is up to date, skipping (use --force to rebuild): {zst_file}")
+            return {
+                "filename": zst_file.name,
+                "path": str(zst_file.relative_to(lldb_root)),
+                "sha256": build_info["sha256"],
+                "size": st.st_size,
+            }
+        print(f"\n[WARN] {zst_file.name} was built with other parameters or has changed, rebuilding")
+
     # Step 1: Get LLVM source
     if source_dir and source_dir.exists():
         print(f"\n[OK] Using provided LLVM source: {source_dir}")
@@ -596,7 +769,7 @@ def process_platform_arch(
         shutil.rmtree(lldb_extracted)
     lldb_extracted.mkdir(parents=True, exist_ok=True)
 
-    binary_count = extract_lldb_binaries(llvm_root, lldb_extracted, platform)
+    binary_count = extract_lldb_binaries(llvm_root, lldb_extracted, platform, verbose=verbose)
 
     if binary_count == 0:
         print(f"[WARN] No LLDB binaries found for {platform}/{arch}")
@@ -607,36 +780,28 @@ def process_platform_arch(
         python_count = copy_python_modules(python_dir, lldb_extracted, platform)
         print(f"[OK] Added {python_count} Python files to archive")
 
-    # Step 3: Create archive name
-    archive_base = f"lldb-{version}-{platform}-{arch}"
-    tar_file = work_dir / f"{archive_base}.tar"
-    zst_file = output_dir / f"{archive_base}.tar.zst"
-
     # Ensure output directory exists
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Step 4: Create TAR
-    create_tar_archive(lldb_extracted, tar_file)
+    # Step 3-4: Create TAR, compressed with zstd and hashed as it is written
+    # (no intermediate .tar on disk, no re-read for the checksum)
+    _, sha256 = create_tar_zst_archive(lldb_extracted, zst_file, level=level, threads=threads)
 
     # Step 5: Verify permissions
-    verify_tar_permissions(tar_file)
+    if verify:
+        verify_tar_permissions(zst_file)
 
-    # Step 6: Compress with zstd
-    compress_with_zstd(tar_file, zst_file)
-
-    # Step 7: Generate checksum
-    print("\nGenerating SHA256 checksum...")
-    sha256 = generate_checksum(zst_file)
-    print(f"SHA256: {sha256}")
+    # Step 7: Record checksum
+    print(f"\nSHA256: {sha256}")
 
     # Write checksum file
-    checksum_file = Path(str(zst_file) + ".sha256")
     with open(checksum_file, "w") as f:
         f.write(f"{sha256}  {zst_file.name}\n")
 
-    # Clean up uncompressed tar
-    print(f"\nRemoving uncompressed tar: {tar_file}")
-    tar_file.unlink()
+    # Record what the archive was built from for the next run's up-to-date check
+    st = zst_file.stat()
+    build_info = {"params": build_params, "sha256": sha256, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    build_info_file.write_text(json.dumps(build_info, indent=2) + "\n")
 
     print("\n[SUCCESS] Archive created successfully!")
     print(f"Archive: {zst_file}")
@@ -685,7 +850,32 @@ def main() -> None:
         type=Path,
         help="Python modules directory (output from extract_python_for_lldb.py)",
     )
-    parser.add_argument("--zstd-level", type=int, default=22, help="Zstd compression level (default: 22)")
+    parser.add_argument(
+        "--zstd-level",
+        type=int,
+        default=DEFAULT_ZSTD_LEVEL,
+        help=f"Zstd compression level (default: {DEFAULT_ZSTD_LEVEL})",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help=(
+            "Rebuild archives even if they were already built with the same --zstd-level, --source-dir and "
+            "--python-dir (changes to the contents of those directories are not detected)"
+        ),
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Re-read each archive and verify member permissions after compressing",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Print every LLDB file as it is extracted")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_JOBS,
+        help=f"Platform/arch combinations to build in parallel (default: {DEFAULT_JOBS})",
+    )
     parser.add_argument(
         "--version",
         help=(
@@ -717,21 +907,47 @@ def main() -> None:
     platforms = [args.platform] if args.platform else ["win", "linux", "darwin"]
     architectures = [args.arch] if args.arch else ["x86_64", "arm64"]
 
-    # Process each platform/arch combination
-    results = {}
+    # Pass python_dir only if --with-python is specified
+    python_dir = args.python_dir if args.with_python else None
+
+    # Get version per platform: explicit --version wins over LLVM_VERSIONS default.
+    combinations = []
     for platform in platforms:
-        # Get version for this platform: explicit --version wins over LLVM_VERSIONS default.
         version = args.version or LLVM_VERSIONS.get(platform)
         if not version:
             print(f"Warning: No LLVM version defined for platform {platform}, skipping")
             continue
-
-        results[platform] = {}
-        for arch in architectures:
+        combinations.extend((platform, arch, version) for arch in architectures)
+
+    # Each platform/arch combination is independent (own download, extraction
+    # and output directory), so build them in parallel. Cap the workers and
+    # split the CPUs between them so the zstd threads don't oversubscribe.
+    cpu_count = os.cpu_count() or 1
+    max_workers = max(1, min(len(combinations), args.jobs))
+    threads = max(1, cpu_count // max_workers)
+
+    results = {platform: {} for platform, _, _ in combinations}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            (platform, arch): executor.submit(
+                process_platform_arch,
+                lldb_root,
+                platform,
+                arch,
+                version,
+                args.source_dir,
+                python_dir,
+                force=args.force,
+                level=args.zstd_level,
+                threads=threads,
+                verify=args.verify,
+                verbose=args.verbose,
+            )
+            for platform, arch, version in combinations
+        }
+        for (platform, arch), future in futures.items():
             try:
-                # Pass python_dir only if --with-python is specified
-                python_dir = args.python_dir if args.with_python else None
-                result = process_platform_arch(lldb_root, platform, arch, version, args.source_dir, python_dir)
+                result = future.result()
                 if result:
                     results[platform][arch] = result
             except Exception as e:
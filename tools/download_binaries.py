@@ -7,14 +7,33 @@ for packaging with the clang-tool-chain Python package.
 """
 
 import argparse
+import contextlib
+import functools
 import hashlib
+import mmap
+import os
 import platform
 import shutil
 import subprocess
 import sys
 import tarfile
+import threading
+import urllib.error
 import urllib.request
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Any
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    from .tar_utils import TAR_EXTRACT_KWARGS, extract_with_system_tar
+except ImportError:
+    from tar_utils import TAR_EXTRACT_KWARGS, extract_with_system_tar
 
 # Import checksum database
 # Note: This import may fail when running the script standalone (before package installation)
@@ -32,6 +51,13 @@ except ImportError:
         return f"{os_name}-{arch}"
 
 
+# Read size for streaming downloads to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Platforms downloaded at once by download_all; each is an independent,
+# I/O-bound download from GitHub
+DEFAULT_DOWNLOAD_JOBS = 8
+
 # Default LLVM version to download
 DEFAULT_VERSION = "21.1.5"
 
@@ -70,6 +96,30 @@ BINARY_CONFIGS: dict[str, dict[str, str]] = {
 }
 
 
+def make_http_client() -> Any:
+    """
+    Create the HTTP client shared by all downloads, if httpx is installed.
+
+    One pooled client keeps connections (and TLS sessions) alive across
+    requests and across the github.com -> objects.githubusercontent.com
+    redirect, and with h2 installed multiplexes the concurrent downloads of
+    download_all over HTTP/2.
+
+    Returns:
+        httpx.Client, or None to fall back to urllib
+    """
+    if httpx is None:
+        return None
+
+    # identity: byte ranges and Content-Length must refer to the file itself
+    options = {"follow_redirects": True, "timeout": None, "headers": {"Accept-Encoding": "identity"}}
+    try:
+        return httpx.Client(http2=True, **options)
+    except ImportError:
+        # http2=True needs the optional h2 package
+        return httpx.Client(**options)
+
+
 class BinaryDownloader:
     """Download and extract LLVM binaries for different platforms."""
 
@@ -86,6 +136,37 @@ class BinaryDownloader:
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.verify_checksums = verify_checksums
+        # download_all runs platforms in threads; only one may prompt at a time
+        self._prompt_lock = threading.Lock()
+        self._http_client = make_http_client()
+        # BINARY_CONFIGS with this version's filenames and URLs filled in
+        self._configs = {
+            platform_key: {key: value.format(version=version) for key, value in config.items()}
+            for platform_key, config in BINARY_CONFIGS.items()
+        }
+
+    def hash_file(self, file_path: Path) -> Any:
+        """
+        SHA256-hash a file.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            hashlib sha256 object, which can be updated further (e.g. with
+            the rest of a resumed download)
+        """
+        sha256_hash = hashlib.sha256()
+        with open(file_path, "rb", buffering=0) as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return sha256_hash  # mmap can't map an empty file
+            # Hash the mapped file in a single update() call: the kernel pages
+            # it in with readahead and nothing is copied through Python buffers
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                sha256_hash.update(mm)
+        return sha256_hash
 
     def compute_sha256(self, file_path: Path) -> str:
         """
@@ -97,20 +178,19 @@ class BinaryDownloader:
         Returns:
             SHA256 checksum as hex string
         """
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            # Read file in chunks to handle large files
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
-        return sha256_hash.hexdigest()
+        return self.hash_file(file_path).hexdigest()
 
-    def verify_checksum(self, file_path: Path, expected_checksum: str | None = None) -> bool:
+    def verify_checksum(
+        self, file_path: Path, expected_checksum: str | None = None, actual_checksum: str | None = None
+    ) -> bool:
         """
         Verify SHA256 checksum of a downloaded file.
 
         Args:
             file_path: Path to the file to verify
             expected_checksum: Expected SHA256 checksum (optional)
+            actual_checksum: SHA256 already computed for file_path (e.g. while
+                downloading it); the file is read and hashed if omitted
 
         Returns:
             True if checksum matches or verification is skipped, False otherwise
@@ -124,7 +204,8 @@ class BinaryDownloader:
 
         try:
             print(f"Verifying checksum for {file_path.name}...")
-            actual_checksum = self.compute_sha256(file_path)
+            if actual_checksum is None:
+                actual_checksum = self.compute_sha256(file_path)
 
             if actual_checksum.lower() == expected_checksum.lower():
                 print(f"✓ Checksum verified: {actual_checksum[:16]}...")
@@ -139,12 +220,120 @@ class BinaryDownloader:
             print(f"Error verifying checksum: {e}")
             return False
 
+    @contextlib.contextmanager
+    def open_url(self, url: str, headers: dict[str, str]) -> Iterator[tuple[int, Any, Iterator[bytes]]]:
+        """
+        Send a GET request and stream the response body.
+
+        Uses the shared httpx client when available (see make_http_client),
+        else urllib. Error statuses raise urllib.error.HTTPError with either
+        backend.
+
+        Args:
+            url: URL to download from
+            headers: Extra request headers (e.g. Range)
+
+        Yields:
+            Tuple of (HTTP status, response headers, iterator over body chunks)
+        """
+        if self._http_client is None:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+                yield response.status, response.headers, iter(lambda: response.read(DOWNLOAD_CHUNK_SIZE), b"")
+            return
+
+        with self._http_client.stream("GET", url, headers=headers) as response:
+            if response.status_code >= 400:
+                raise urllib.error.HTTPError(url, response.status_code, response.reason_phrase, response.headers, None)
+            yield response.status_code, response.headers, response.iter_bytes(DOWNLOAD_CHUNK_SIZE)
+
+    def fetch(self, url: str, destination: Path, show_progress: bool = True) -> tuple[bool, str]:
+        """
+        Stream a URL to destination, resuming an interrupted download.
+
+        Data goes to <destination>.part, which is renamed into place once
+        complete. If a .part file is left over from an earlier attempt, only
+        the missing tail is requested with an HTTP Range request; If-Range
+        (with the ETag stored next to the .part file) makes the server send
+        the whole file instead if it changed in the meantime.
+
+        The SHA256 is computed from the chunks as they are written, so a
+        fresh download never has to be read back for verification.
+
+        Args:
+            url: URL to download from
+            destination: Path to save the file
+            show_progress: Whether to show download progress
+
+        Returns:
+            Tuple of (True if the download continued a partial file, SHA256 hex digest of the file)
+        """
+        partial = destination.with_name(destination.name + ".part")
+        etag_file = destination.with_name(destination.name + ".part.etag")
+
+        headers = {}
+        resume_from = partial.stat().st_size if partial.exists() else 0
+        if resume_from:
+            print(f"Resuming from {resume_from / (1024 * 1024):.1f} MB")
+            headers["Range"] = f"bytes={resume_from}-"
+            if etag_file.exists():
+                headers["If-Range"] = etag_file.read_text().strip()
+
+        try:
+            with self.open_url(url, headers) as (status, response_headers, chunks):
+                etag = response_headers.get("ETag")
+                if etag:
+                    etag_file.write_text(etag + "\n")
+
+                # 206 continues the partial file; a 200 (no range support, or
+                # If-Range mismatch) carries the whole file
+                resumed = status == 206
+                downloaded = resume_from if resumed else 0
+                total_size = downloaded + int(response_headers.get("Content-Length") or 0)
+                # Only the kept prefix of a resumed file has to be read back
+                sha256_hash = self.hash_file(partial) if resumed else hashlib.sha256()
+
+                # Stream to disk in large chunks, with progress reporting
+                with open(partial, "ab" if resumed else "wb") as out:
+                    for chunk in chunks:
+                        out.write(chunk)
+                        sha256_hash.update(chunk)
+                        downloaded += len(chunk)
+                        if show_progress and total_size > 0:
+                            percent = min(100, downloaded * 100 / total_size)
+                            mb_downloaded = downloaded / (1024 * 1024)
+                            mb_total = total_size / (1024 * 1024)
+                            print(f"\rProgress: {percent:.1f}% ({mb_downloaded:.1f}/{mb_total:.1f} MB)", end="")
+        except urllib.error.HTTPError as e:
+            if e.code != 416 or not resume_from:
+                raise
+            # Range not satisfiable: either the partial file is already
+            # complete ("bytes */<size>") or it can't belong to this file
+            if e.headers.get("Content-Range") == f"bytes */{resume_from}":
+                partial.replace(destination)
+                etag_file.unlink(missing_ok=True)
+                return True, self.compute_sha256(destination)
+            print("Cannot resume partial download, starting over")
+            partial.unlink()
+            etag_file.unlink(missing_ok=True)
+            return self.fetch(url, destination, show_progress)
+
+        if show_progress:
+            print()  # New line after progress
+
+        partial.replace(destination)
+        etag_file.unlink(missing_ok=True)
+        return resumed, sha256_hash.hexdigest()
+
     def download_file(
         self, url: str, destination: Path, show_progress: bool = True, expected_checksum: str | None = None
     ) -> bool:
         """
         Download a file from URL to destination.
 
+        An interrupted download (or an existing file that fails checksum
+        verification, which is usually a truncated one) is resumed rather
+        than fetched again from the start; see fetch().
+
         Args:
             url: URL to download from
             destination: Path to save the file
@@ -166,31 +355,30 @@ class BinaryDownloader:
                         print("Existing file verified, skipping download.")
                         return True
                     else:
-                        print("Existing file failed verification, re-downloading...")
+                        # Most likely truncated: keep what we have and
+                        # request only the rest
+                        print("Existing file failed verification, resuming download...")
+                        destination.replace(destination.with_name(destination.name + ".part"))
                 else:
-                    response = input("Overwrite? (y/n): ").lower()
+                    with self._prompt_lock:
+                        response = input(f"Overwrite {destination.name}? (y/n): ").lower()
                     if response != "y":
                         print("Skipping download.")
                         return True
 
-            # Download with progress reporting
-            def reporthook(blocknum: int, blocksize: int, totalsize: int) -> None:
-                if show_progress and totalsize > 0:
-                    downloaded = blocknum * blocksize
-                    percent = min(100, downloaded * 100 / totalsize)
-                    mb_downloaded = downloaded / (1024 * 1024)
-                    mb_total = totalsize / (1024 * 1024)
-                    print(f"\rProgress: {percent:.1f}% ({mb_downloaded:.1f}/{mb_total:.1f} MB)", end="")
-
-            urllib.request.urlretrieve(url, destination, reporthook if show_progress else None)
-
-            if show_progress:
-                print()  # New line after progress
+            resumed, sha256 = self.fetch(url, destination, show_progress)
 
             print(f"Successfully downloaded to {destination}")
 
-            # Verify checksum if provided
-            if expected_checksum and not self.verify_checksum(destination, expected_checksum):
+            # A resumed file is only as good as the bytes kept from before:
+            # if it fails verification, fetch it once more from scratch
+            if resumed and expected_checksum and not self.verify_checksum(destination, expected_checksum, sha256):
+                print("Resumed download failed verification, downloading from scratch...")
+                destination.unlink()
+                _, sha256 = self.fetch(url, destination, show_progress)
+
+            # Verify checksum if provided (hashed during the download, no re-read)
+            if expected_checksum and not self.verify_checksum(destination, expected_checksum, sha256):
                 print("Warning: Downloaded file failed checksum verification")
                 print("The file may be corrupted or tampered with")
                 # Don't return False to allow continuation, but warn user
@@ -202,13 +390,20 @@ class BinaryDownloader:
             print(f"Error downloading {url}: {e}")
             return False
 
-    def extract_archive(self, archive_path: Path, extract_dir: Path) -> bool:
+    def extract_archive(
+        self,
+        archive_path: Path,
+        extract_dir: Path,
+        members_filter: Callable[[tarfile.TarInfo], bool] | None = None,
+    ) -> bool:
         """
         Extract a tar.xz archive.
 
         Args:
             archive_path: Path to the archive file
             extract_dir: Directory to extract to
+            members_filter: If given, only members it returns True for are
+                extracted (default: extract everything)
 
         Returns:
             True if extraction was successful, False otherwise
@@ -217,8 +412,18 @@ class BinaryDownloader:
             print(f"Extracting {archive_path}...")
             extract_dir.mkdir(parents=True, exist_ok=True)
 
-            with tarfile.open(archive_path, "r:xz") as tar:
-                tar.extractall(extract_dir)
+            if members_filter is not None:
+                # Stream the archive once, writing only the selected members
+                with tarfile.open(archive_path, "r|xz") as tar:
+                    for member in tar:
+                        if members_filter(member):
+                            tar.extract(member, extract_dir, **TAR_EXTRACT_KWARGS)
+            # XZ_OPT=-T0 lets xz 5.4+ decompress on all cores
+            elif not extract_with_system_tar(
+                archive_path, extract_dir, ["-J"], "xz", env=dict(os.environ, XZ_OPT="-T0")
+            ):
+                with tarfile.open(archive_path, "r:xz") as tar:
+                    tar.extractall(extract_dir, **TAR_EXTRACT_KWARGS)
 
             print(f"Successfully extracted to {extract_dir}")
             return True
@@ -265,13 +470,16 @@ class BinaryDownloader:
             print(f"Error extracting {installer_path}: {e}")
             return False
 
-    def download_platform(self, platform_key: str, expected_checksum: str | None = None) -> Path | None:
+    def download_platform(
+        self, platform_key: str, expected_checksum: str | None = None, show_progress: bool = True
+    ) -> Path | None:
         """
         Download binaries for a specific platform.
 
         Args:
             platform_key: Platform identifier (e.g., "linux-x86_64")
             expected_checksum: Optional SHA256 checksum to verify download
+            show_progress: Whether to show download progress
 
         Returns:
             Path to the extracted directory, or None if download failed
@@ -281,9 +489,9 @@ class BinaryDownloader:
             print(f"Available platforms: {', '.join(BINARY_CONFIGS.keys())}")
             return None
 
-        config = BINARY_CONFIGS[platform_key]
-        filename = config["filename"].format(version=self.version)
-        url = config["url"].format(version=self.version)
+        config = self._configs[platform_key]
+        filename = config["filename"]
+        url = config["url"]
 
         # Try to get checksum from database if not provided
         if expected_checksum is None and self.verify_checksums:
@@ -310,14 +518,14 @@ class BinaryDownloader:
 
         # Download the file
         download_path = self.output_dir / filename
-        if not self.download_file(url, download_path, expected_checksum=expected_checksum):
+        if not self.download_file(url, download_path, show_progress, expected_checksum=expected_checksum):
             # Try alternative URL if available
             if "alt_url" in config and "alt_filename" in config:
                 print("Trying alternative download URL...")
-                filename = config["alt_filename"].format(version=self.version)
-                url = config["alt_url"].format(version=self.version)
+                filename = config["alt_filename"]
+                url = config["alt_url"]
                 download_path = self.output_dir / filename
-                if not self.download_file(url, download_path, expected_checksum=expected_checksum):
+                if not self.download_file(url, download_path, show_progress, expected_checksum=expected_checksum):
                     return None
             else:
                 return None
@@ -334,12 +542,18 @@ class BinaryDownloader:
 
         return extract_dir
 
-    def download_all(self, platforms: list[str] | None = None) -> dict[str, Path | None]:
+    def download_all(
+        self, platforms: list[str] | None = None, max_workers: int = DEFAULT_DOWNLOAD_JOBS
+    ) -> dict[str, Path | None]:
         """
         Download binaries for all or specified platforms.
 
+        Platforms are independent, so they are downloaded and extracted in
+        parallel threads (the work is network and disk bound).
+
         Args:
             platforms: List of platform keys to download, or None for all
+            max_workers: Maximum number of platforms to download at once
 
         Returns:
             Dictionary mapping platform keys to extracted directory paths
@@ -347,27 +561,38 @@ class BinaryDownloader:
         if platforms is None:
             platforms = list(BINARY_CONFIGS.keys())
 
-        results = {}
-        for platform_key in platforms:
-            print(f"\n{'='*60}")
-            print(f"Downloading {platform_key}")
-            print(f"{'='*60}\n")
+        workers = max(1, min(max_workers, len(platforms)))
+        # Concurrent \r progress lines would overwrite each other
+        show_progress = workers == 1
 
-            extract_dir = self.download_platform(platform_key)
-            results[platform_key] = extract_dir
+        def download(platform_key: str) -> Path | None:
+            print(f"\n{'='*60}\nDownloading {platform_key}\n{'='*60}\n")
+            return self.download_platform(platform_key, show_progress=show_progress)
 
-            if extract_dir:
-                print(f"✓ {platform_key}: Success")
-            else:
-                print(f"✗ {platform_key}: Failed")
+        results = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(download, platform_key): platform_key for platform_key in platforms}
+            for future in as_completed(futures):
+                platform_key = futures[future]
+                extract_dir = future.result()
+                results[platform_key] = extract_dir
+
+                if extract_dir:
+                    print(f"✓ {platform_key}: Success")
+                else:
+                    print(f"✗ {platform_key}: Failed")
 
-        return results
+        # Report in the requested order, not completion order
+        return {platform_key: results[platform_key] for platform_key in platforms}
 
 
+@functools.lru_cache(maxsize=1)
 def get_current_platform() -> str | None:
     """
     Detect the current platform and return its key.
 
+    The result is cached: the host platform can't change within a process.
+
     Returns:
         Platform key string, or None if platform not supported
     """
@@ -414,6 +639,12 @@ def main() -> None:
         action="store_true",
         help="Only download binaries for the current platform",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_DOWNLOAD_JOBS,
+        help=f"Platforms to download in parallel (default: {DEFAULT_DOWNLOAD_JOBS})",
+    )
     parser.add_argument(
         "--no-verify",
         action="store_true",
@@ -437,7 +668,7 @@ def main() -> None:
 
     # Download binaries
     downloader = BinaryDownloader(version=args.version, output_dir=args.output, verify_checksums=not args.no_verify)
-    results = downloader.download_all(platforms=platforms)
+    results = downloader.download_all(platforms=platforms, max_workers=args.jobs)
 
     # Print summary
     print(f"\n{'='*60}")
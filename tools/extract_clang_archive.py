@@ -16,11 +16,13 @@ Usage:
 Requirements:
     - zstandard module (installed via: uv pip install zstandard)
     - tarfile module (built-in)
+    - system tar and zstd (optional; used instead of tarfile when available)
 """
 
 import argparse
 import sys
 import tarfile
+from collections.abc import Callable
 from pathlib import Path
 
 try:
@@ -30,14 +32,39 @@ except ImportError:
     print("Install with: uv pip install zstandard", file=sys.stderr)
     sys.exit(1)
 
+try:
+    from .tar_utils import TAR_EXTRACT_KWARGS, extract_with_system_tar
+except ImportError:
+    from tar_utils import TAR_EXTRACT_KWARGS, extract_with_system_tar
+
+# Read size for the zstd stream reader and the tar stream on top of it; the
+# defaults (128 KB / 10 KB) cost thousands of small Python-level reads
+STREAM_READ_SIZE = 1024 * 1024
+
+# Archive paths (below the top-level directory) needed to run LLDB: the
+# binaries plus liblldb, which they load at runtime
+LLDB_MEMBER_PREFIXES = ("bin/lldb", "lib/liblldb")
+
 
-def extract_clang_archive(archive_path: Path, output_dir: Path) -> dict:
+def is_lldb_member(member: tarfile.TarInfo) -> bool:
+    """Return True for the LLDB binaries and liblldb* libraries of a clang archive."""
+    _, _, relative = member.name.partition("/")
+    return relative.startswith(LLDB_MEMBER_PREFIXES)
+
+
+def extract_clang_archive(
+    archive_path: Path,
+    output_dir: Path,
+    members_filter: Callable[[tarfile.TarInfo], bool] | None = None,
+) -> dict:
     """
     Extract clang archive and locate LLDB binaries.
 
     Args:
         archive_path: Path to tar.zst archive
         output_dir: Directory to extract to
+        members_filter: If given, only members it returns True for are
+            written (e.g. is_lldb_member); the whole archive is still read
 
     Returns:
         dict with status, extracted_dir, and lldb_binaries paths
@@ -55,11 +82,25 @@ def extract_clang_archive(archive_path: Path, output_dir: Path) -> dict:
 
     # Decompress zstd + extract tar
     try:
-        with open(archive_path, 'rb') as compressed:
-            dctx = zstd.ZstdDecompressor()
-            with dctx.stream_reader(compressed) as reader, tarfile.open(fileobj=reader, mode='r|') as tar:
-                # Extract all files
-                tar.extractall(path=output_dir)
+        # A filtered extraction writes only a handful of files, so the
+        # Python path is cheap there and system tar isn't worth it
+        if members_filter is not None or not extract_with_system_tar(
+            archive_path, output_dir, ["--use-compress-program=zstd -d -T0"], "zstd"
+        ):
+            with open(archive_path, 'rb') as compressed:
+                dctx = zstd.ZstdDecompressor()
+                with (
+                    dctx.stream_reader(compressed, read_size=STREAM_READ_SIZE) as reader,
+                    tarfile.open(fileobj=reader, mode='r|', bufsize=STREAM_READ_SIZE) as tar,
+                ):
+                    if members_filter is None:
+                        # Extract all files
+                        tar.extractall(path=output_dir, **TAR_EXTRACT_KWARGS)
+                    else:
+                        # "r|" reads strictly forward, so test each member as it streams by
+                        for member in tar:
+                            if members_filter(member):
+                                tar.extract(member, path=output_dir, **TAR_EXTRACT_KWARGS)
 
         print(f"✓ Extracted to: {output_dir}")
     except Exception as e:
@@ -68,35 +109,33 @@ def extract_clang_archive(archive_path: Path, output_dir: Path) -> dict:
             "message": f"Extraction failed: {e}",
         }
 
-    # Find extracted directory (usually has nested structure)
-    extracted_subdirs = [d for d in output_dir.iterdir() if d.is_dir()]
+    # Locate bin/ in the extraction root: usually the archive extracts to a
+    # single subdirectory, else straight into output_dir
+    bin_dir = next(output_dir.glob("*/bin"), None)
+    if bin_dir is None and (output_dir / "bin").exists():
+        bin_dir = output_dir / "bin"
 
-    if not extracted_subdirs:
+    if bin_dir is None:
         return {
             "status": "error",
-            "message": f"No subdirectories found in {output_dir}",
+            "message": f"bin/ directory not found in {output_dir}",
         }
 
-    # Usually the archive extracts to a single subdirectory
-    extracted_dir = extracted_subdirs[0] if len(extracted_subdirs) == 1 else output_dir
+    extracted_dir = bin_dir.parent
 
     print(f"✓ Extracted directory: {extracted_dir}")
 
     # Locate LLDB binaries
     lldb_binaries = {}
-    bin_dir = extracted_dir / "bin"
-
-    if bin_dir.exists():
-        for binary_name in ["lldb", "lldb-server", "lldb-argdumper"]:
-            binary_path = bin_dir / binary_name
-            if binary_path.exists():
-                lldb_binaries[binary_name] = binary_path
-                size_mb = binary_path.stat().st_size / (1024 * 1024)
-                print(f"  ✓ Found: {binary_name} ({size_mb:.1f} MB)")
-            else:
-                print(f"  ✗ Missing: {binary_name}")
-    else:
-        print(f"  ✗ bin/ directory not found in {extracted_dir}")
+
+    for binary_name in ["lldb", "lldb-server", "lldb-argdumper"]:
+        binary_path = bin_dir / binary_name
+        if binary_path.exists():
+            lldb_binaries[binary_name] = binary_path
+            size_mb = binary_path.stat().st_size / (1024 * 1024)
+            print(f"  ✓ Found: {binary_name} ({size_mb:.1f} MB)")
+        else:
+            print(f"  ✗ Missing: {binary_name}")
 
     return {
         "status": "success",
@@ -122,11 +161,16 @@ def main():
         required=True,
         help="Output directory for extraction (e.g., work/llvm_linux_x64)",
     )
+    parser.add_argument(
+        "--lldb-only",
+        action="store_true",
+        help="Only extract the LLDB binaries and liblldb* instead of the whole tree",
+    )
 
     args = parser.parse_args()
 
     # Extract archive
-    result = extract_clang_archive(args.archive, args.output)
+    result = extract_clang_archive(args.archive, args.output, is_lldb_member if args.lldb_only else None)
 
     if result["status"] == "error":
         print(f"\n❌ ERROR: {result['message']}", file=sys.stderr)
@@ -3,7 +3,7 @@
 Extract IWYU binaries from Homebrew for redistribution.
 
 This script:
-1. Installs IWYU via Homebrew (pre-built binaries)
+1. Installs IWYU via Homebrew (pre-built binaries), unless already installed
 2. Extracts the IWYU binary and support files
 3. Copies them to downloads-bins/assets/iwyu/{platform}/{arch}/
 4. Verifies the binary has acceptable dependencies
@@ -11,12 +11,36 @@ This script:
 This is MUCH faster than building from source (~2 min vs ~10 min).
 """
 
+import contextlib
+import functools
+import json
+import os
 import platform
+import re
 import shutil
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+# Persistent cache of `brew --prefix` results. Every brew invocation pays a
+# Ruby startup (~200 ms); the cache is dropped whenever the Homebrew checkout
+# moves (brew update rewrites its .git/HEAD)
+BREW_PREFIX_CACHE = Path.home() / ".cache" / "clang-tool-chain-bins" / "brew_prefix.json"
+
+# Version token in `include-what-you-use --version` output
+IWYU_VERSION_RE = re.compile(r"(?:^|\s)include-what-you-use[ \t]+(\S+)", re.IGNORECASE | re.MULTILINE)
+
+# Name prefixes of the LLVM dylibs copy_llvm_dylibs starts its walk from
+LLVM_DYLIB_PREFIXES = ("libLLVM", "libclang")
+
+# Install-name prefixes of Homebrew-provided libraries (arm64, then x86_64)
+HOMEBREW_PATH_MARKERS = ("/opt/homebrew/", "/usr/local/opt/", "/usr/local/Cellar/")
+
+# Per-file header in `otool -L` output: "<path>:", or
+# "<path> (architecture arm64):" for each slice of a universal binary
+OTOOL_HEADER_RE = re.compile(r"^(.*?)(?: \(architecture [^)]*\))?:$")
+
 
 def get_current_arch():
     """Get current macOS architecture."""
@@ -29,6 +53,117 @@ def get_current_arch():
         raise RuntimeError(f"Unsupported architecture: {machine}")
 
 
+def _brew_repository_head() -> Path | None:
+    """Locate Homebrew's .git/HEAD without running brew, or None if not found."""
+    for repository in (os.environ.get("HOMEBREW_REPOSITORY"), "/opt/homebrew", "/usr/local/Homebrew"):
+        if repository:
+            head = Path(repository) / ".git" / "HEAD"
+            if head.exists():
+                return head
+    return None
+
+
+def _load_brew_prefix_cache() -> dict[str, str]:
+    """Read BREW_PREFIX_CACHE, or return {} if it is missing or stale."""
+    head = _brew_repository_head()
+    if head is None:
+        return {}  # Nothing to validate the cache against
+    try:
+        if BREW_PREFIX_CACHE.stat().st_mtime < head.stat().st_mtime:
+            return {}
+        return json.loads(BREW_PREFIX_CACHE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+@functools.lru_cache(maxsize=None)
+def _brew_prefix(formula: str | None = None) -> Path:
+    """
+    Return `brew --prefix [formula]`, cached in memory and in BREW_PREFIX_CACHE.
+
+    Raises:
+        subprocess.CalledProcessError: If brew fails
+    """
+    key = formula or ""
+    cache = _load_brew_prefix_cache()
+    if key in cache:
+        return Path(cache[key])
+
+    result = subprocess.run(
+        ["brew", "--prefix", *([formula] if formula else [])],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    prefix = result.stdout.strip()
+
+    cache[key] = prefix
+    with contextlib.suppress(OSError):
+        BREW_PREFIX_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        BREW_PREFIX_CACHE.write_text(json.dumps(cache, indent=2) + "\n")
+    return Path(prefix)
+
+
+def is_homebrew_path(path: str) -> bool:
+    """Return True if an install name points into a Homebrew prefix."""
+    return any(marker in path for marker in HOMEBREW_PATH_MARKERS)
+
+
+def otool_dependencies(paths: list[Path]) -> dict[Path, list[str]]:
+    """
+    List the libraries several Mach-O files link against with one `otool -L` call.
+
+    Args:
+        paths: Binaries/dylibs to inspect
+
+    Returns:
+        Mapping of each inspected path to its dependency install names (for
+        a dylib this includes its own install name, as otool lists it)
+    """
+    dependencies: dict[Path, list[str]] = {}
+    if not paths:
+        return dependencies
+
+    result = subprocess.run(
+        ["otool", "-L", *(str(path) for path in paths)],
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        # otool still reports every file it could read
+        print(f"  ✗ otool -L failed for some files: {result.stderr.strip()}")
+
+    by_name = {str(path): path for path in paths}
+    current = None
+    for line in result.stdout.splitlines():
+        if not line.strip():
+            continue
+        header = OTOOL_HEADER_RE.match(line) if not line[0].isspace() else None
+        if header:
+            name = header.group(1)
+            current = dependencies.setdefault(by_name.get(name, Path(name)), [])
+        elif current is not None:
+            current.append(line.split()[0])
+
+    return dependencies
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """
+    Place src at dst with a hard link (no data copied), else shutil.copy2.
+
+    Only for files that are never modified afterwards: a hard link shares
+    its data with the Homebrew original. Files install_name_tool rewrites
+    (the binary and the bundled dylibs) need a real copy.
+    """
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)  # Different filesystem or no hard link support
+
+
 def install_iwyu_homebrew() -> Path:
     """
     Install include-what-you-use via Homebrew.
@@ -40,26 +175,33 @@ def install_iwyu_homebrew() -> Path:
     print("INSTALLING IWYU VIA HOMEBREW")
     print("="*70 + "\n")
 
-    # Install IWYU (includes LLVM as dependency)
+    # Skip the install (seconds of tap and bottle resolution, even when
+    # nothing changes) if the formula is already there
+    try:
+        iwyu_path = _brew_prefix("include-what-you-use")
+    except subprocess.CalledProcessError:
+        iwyu_path = None
+    if iwyu_path is not None and os.access(iwyu_path / "bin" / "include-what-you-use", os.X_OK):
+        print(f"✓ IWYU already installed at: {iwyu_path}")
+        return iwyu_path
+
+    # Install IWYU (includes LLVM as dependency), without the implicit
+    # `brew update` and post-install cleanup
     print("Running: brew install include-what-you-use")
-    subprocess.run(["brew", "install", "include-what-you-use"], check=True)
+    env = dict(os.environ, HOMEBREW_NO_AUTO_UPDATE="1", HOMEBREW_NO_INSTALL_CLEANUP="1")
+    subprocess.run(["brew", "install", "include-what-you-use"], check=True, env=env)
 
     # Get installation path
-    result = subprocess.run(
-        ["brew", "--prefix", "include-what-you-use"],
-        capture_output=True,
-        text=True,
-        check=True
-    )
-    iwyu_path = Path(result.stdout.strip())
+    iwyu_path = _brew_prefix("include-what-you-use")
 
     print(f"\n✓ IWYU installed at: {iwyu_path}")
 
     return iwyu_path
 
 
+@functools.lru_cache(maxsize=None)
 def get_iwyu_version(iwyu_path: Path) -> str:
-    """Get IWYU version from installed binary."""
+    """Get IWYU version from installed binary (run once per path)."""
     binary = iwyu_path / "bin" / "include-what-you-use"
 
     if not binary.exists():
@@ -73,15 +215,11 @@ def get_iwyu_version(iwyu_path: Path) -> str:
 
     # Parse version from output like:
     # "include-what-you-use 0.25 based on clang version 21.1.6"
-    output = result.stdout + result.stderr
-    for line in output.split('\n'):
-        if 'include-what-you-use' in line.lower():
-            parts = line.split()
-            for i, part in enumerate(parts):
-                if part.lower() == 'include-what-you-use' and i + 1 < len(parts):
-                    version = parts[i + 1]
-                    print(f"✓ Detected IWYU version: {version}")
-                    return version
+    match = IWYU_VERSION_RE.search(result.stdout + result.stderr)
+    if match:
+        version = match.group(1)
+        print(f"✓ Detected IWYU version: {version}")
+        return version
 
     # Fallback: assume 0.25
     print("⚠️  Could not detect version, assuming 0.25")
@@ -158,13 +296,7 @@ def copy_llvm_dylibs(iwyu_path: Path, output_dir: Path) -> int:
 
     # Get LLVM path from Homebrew
     try:
-        result = subprocess.run(
-            ["brew", "--prefix", "llvm"],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        llvm_path = Path(result.stdout.strip())
+        llvm_path = _brew_prefix("llvm")
     except subprocess.CalledProcessError as e:
         print(f"⚠️  Failed to get LLVM path from Homebrew: {e}")
         return 0
@@ -199,25 +331,19 @@ def copy_llvm_dylibs(iwyu_path: Path, output_dir: Path) -> int:
     output_lib_dir.mkdir(parents=True, exist_ok=True)
     print(f"Output lib directory: {output_lib_dir}")
 
-    # Find and copy LLVM dylibs - be more aggressive in finding them
-    dylib_patterns = [
-        "libLLVM*.dylib",
-        "libclang*.dylib",
-        "libLLVM.dylib",
-        "libclang.dylib",
-        "libclang-cpp.dylib",
-    ]
-
-    # Also check for symlinks and resolve them
+    # Find LLVM dylibs (libLLVM*.dylib, libclang*.dylib) - including
+    # symlinks, which are resolved when copying - in one directory pass
     print("\nSearching for LLVM dylibs...")
-    all_dylibs = set()
-    for pattern in dylib_patterns:
-        found = list(llvm_lib_dir.glob(pattern))
-        print(f"  Pattern '{pattern}': found {len(found)} files")
-        all_dylibs.update(found)
+    with os.scandir(llvm_lib_dir) as entries:
+        all_dylibs = {
+            Path(entry.path)
+            for entry in entries
+            if entry.name.startswith(LLVM_DYLIB_PREFIXES) and entry.name.endswith(".dylib")
+        }
+    print(f"  Found {len(all_dylibs)} files")
 
-    # Track which actual files we've copied (used by recursive function)
-    copied_targets = set()
+    # Actual files to copy, by name in lib/ (filled in by copy_dylib)
+    copied_targets: dict[str, Path] = {}
 
     print(f"\nWill recursively copy {len(all_dylibs)} LLVM dylib(s) and ALL their dependencies...")
 
@@ -226,101 +352,82 @@ def copy_llvm_dylibs(iwyu_path: Path, output_dir: Path) -> int:
     print("RECURSIVELY COPYING ALL HOMEBREW DEPENDENCIES")
     print("="*70 + "\n")
 
-    def get_homebrew_dependencies(dylib_path: Path) -> set[Path]:
-        """Get all Homebrew dylib dependencies of a given dylib."""
-        try:
-            result = subprocess.run(
-                ["otool", "-L", str(dylib_path)],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+    # Names already recreated as symlinks in lib/
+    linked_names: set[str] = set()
+
+    def copy_dylib(dylib_path: Path, visited: set[Path]) -> Path | None:
+        """Schedule a dylib for copying (recreating it as a symlink if it is one).
 
+        Returns:
+            The source file scheduled for copying, or None if it was already handled
+        """
+        dylib_name = dylib_path.name
+        # Key the walk by real path: all names in a symlink chain lead to one
+        # file, which is copied (and inspected with otool) only once
+        target = dylib_path.resolve(strict=False)
+        target_name = target.name
+
+        # Recreate each symlink name once; dependents may refer to any of them
+        if dylib_path.is_symlink() and dylib_name != target_name and dylib_name not in linked_names:
+            linked_names.add(dylib_name)
+            symlink_dest = output_lib_dir / dylib_name
+            if symlink_dest.exists() or symlink_dest.is_symlink():
+                symlink_dest.unlink()
+            symlink_dest.symlink_to(target_name)
+            print(f"  Symlink: {dylib_name} -> {target_name}")
+
+        # Skip if already processed
+        if target in visited:
+            return None
+        visited.add(target)
+
+        # lib/ is flat: a different file with the same name can't be bundled
+        if target_name in copied_targets:
+            return None
+
+        print(f"Copying: {target_name}")
+        copied_targets[target_name] = target
+        return target
+
+    # Walk the dependency graph breadth-first, starting with the LLVM dylibs:
+    # each level's newly copied dylibs are inspected with a single otool call
+    copied_count = 0
+    visited_dylibs: set[Path] = set()
+    frontier = sorted(all_dylibs)
+    while frontier:
+        new_dylibs = [copied for copied in (copy_dylib(dylib, visited_dylibs) for dylib in frontier) if copied]
+        copied_count += len(new_dylibs)
+
+        next_frontier = set()
+        for dylib_path, dependencies in otool_dependencies(new_dylibs).items():
             print(f"\n--- Analyzing dependencies for: {dylib_path.name} ---")
             print(f"Full source path: {dylib_path}")
             print("otool -L output:")
 
             homebrew_deps = set()
-            all_lines = result.stdout.split('\n')
-            for line in all_lines:
-                stripped = line.strip()
-                if stripped:
-                    print(f"  {stripped}")
-
-                # Look for Homebrew paths
-                if '/opt/homebrew/' in line or '/usr/local/opt/' in line or '/usr/local/Cellar/' in line:
-                    # Extract the path (first part before compatibility version)
-                    # Strip trailing colon from otool -L output format
-                    dep_path = line.split()[0].rstrip(':')
-                    print(f"    ✓ Found Homebrew dep: {dep_path}")
-                    homebrew_deps.add(Path(dep_path))
+            for dependency in dependencies:
+                print(f"  {dependency}")
+                if is_homebrew_path(dependency):
+                    print(f"    ✓ Found Homebrew dep: {dependency}")
+                    homebrew_deps.add(Path(dependency))
 
             if homebrew_deps:
                 print(f"  → Total Homebrew dependencies found: {len(homebrew_deps)}")
             else:
                 print("  → No Homebrew dependencies found in this dylib")
+            next_frontier.update(homebrew_deps)
 
-            return homebrew_deps
-        except subprocess.CalledProcessError as e:
-            print(f"  ✗ Error running otool on {dylib_path}: {e}")
-            return set()
+        frontier = sorted(next_frontier)
 
-    def copy_dylib_with_deps(dylib_path: Path, visited: set[str]) -> int:
-        """Recursively copy a dylib and all its Homebrew dependencies."""
-        count = 0
-        dylib_name = dylib_path.name
-
-        # Skip if already processed
-        if dylib_name in visited:
-            return 0
-
-        visited.add(dylib_name)
-
-        # Resolve symlinks
-        if dylib_path.is_symlink():
-            target = dylib_path.resolve()
-            target_name = target.name
-
-            # Copy target if not already copied
-            if target_name not in copied_targets:
-                print(f"Copying: {target_name}")
-                dest = output_lib_dir / target_name
-                shutil.copy2(target, dest)
-                copied_targets.add(target_name)
-                count += 1
-
-                # Recursively copy dependencies of this dylib
-                deps = get_homebrew_dependencies(target)
-                for dep in deps:
-                    count += copy_dylib_with_deps(dep, visited)
-
-            # Create symlink
-            symlink_dest = output_lib_dir / dylib_name
-            if symlink_dest.exists() or symlink_dest.is_symlink():
-                symlink_dest.unlink()
-            symlink_dest.symlink_to(target_name)
-            print(f"  Symlink: {dylib_name} -> {target_name}")
-        else:
-            # Regular file
-            if dylib_name not in copied_targets:
-                print(f"Copying: {dylib_name}")
-                dest = output_lib_dir / dylib_name
-                shutil.copy2(dylib_path, dest)
-                copied_targets.add(dylib_name)
-                count += 1
-
-                # Recursively copy dependencies of this dylib
-                deps = get_homebrew_dependencies(dylib_path)
-                for dep in deps:
-                    count += copy_dylib_with_deps(dep, visited)
-
-        return count
-
-    # Start with LLVM dylibs and recursively get all dependencies
-    copied_count = 0
-    visited_dylibs = set()
-    for dylib in sorted(all_dylibs):
-        copied_count += copy_dylib_with_deps(dylib, visited_dylibs)
+    # The walk only reads the Homebrew files, so the copies are done once it
+    # has found them all; they are independent and I/O-bound, so in parallel.
+    # Real copies, not links: fix_install_names rewrites every one of them
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        copies = [
+            executor.submit(shutil.copy2, source, output_lib_dir / name) for name, source in copied_targets.items()
+        ]
+        for future in as_completed(copies):
+            future.result()
 
     print(f"\n✓ Recursively copied {copied_count} total dylib(s) (including all dependencies)")
     print(f"  Total dylibs in lib/: {len(copied_targets)}")
@@ -339,24 +446,12 @@ def fix_install_names(output_dir: Path) -> None:
     print("FIXING INSTALL NAMES")
     print("="*70 + "\n")
 
-    def fix_binary_dependencies(binary_path: Path, is_dylib: bool = False):
-        """Fix install names for a single binary or dylib."""
-        # Get current dependencies
-        result = subprocess.run(
-            ["otool", "-L", str(binary_path)],
-            capture_output=True,
-            text=True,
-            check=True
-        )
-
-        # Find Homebrew dependencies and fix them
-        for line in result.stdout.split('\n'):
-            line = line.strip()
-
-            # Look for Homebrew paths (LLVM, Z3, etc.)
-            if '/opt/homebrew/' in line or '/usr/local/opt/' in line or '/usr/local/Cellar/' in line:
-                # Extract the path (first part before compatibility version)
-                old_path = line.split()[0]
+    def install_name_changes(binary_path: Path, dependencies: list[str], is_dylib: bool = False) -> list[str]:
+        """Build the install_name_tool -change arguments for a single binary or dylib."""
+        # Find Homebrew dependencies (LLVM, Z3, etc.) and fix them
+        changes = []
+        for old_path in dict.fromkeys(dependencies):
+            if is_homebrew_path(old_path):
                 dylib_name = Path(old_path).name
 
                 # For dylibs, use @loader_path; for binaries, use @executable_path
@@ -365,26 +460,40 @@ def fix_install_names(output_dir: Path) -> None:
                 print(f"Fixing: {binary_path.name}")
                 print(f"  Old: {old_path}")
                 print(f"  New: {new_path}")
+                changes += ["-change", old_path, new_path]
 
-                subprocess.run(
-                    ["install_name_tool", "-change", old_path, new_path, str(binary_path)],
-                    check=True
-                )
+        return changes
 
-    # Fix IWYU binary
+    # The IWYU binary plus all bundled dylibs (skipping symlinks, only
+    # actual files), inspected with a single otool call
     binary = output_dir / "bin" / "include-what-you-use"
+    lib_dir = output_dir / "lib"
+    dylibs = [dylib for dylib in lib_dir.glob("*.dylib") if not dylib.is_symlink()] if lib_dir.exists() else []
+    dependencies = otool_dependencies(([binary] if binary.exists() else []) + dylibs)
+
+    changes = {}
+
+    # Fix IWYU binary
     if binary.exists():
         print("Fixing IWYU binary:")
-        fix_binary_dependencies(binary, is_dylib=False)
+        changes[binary] = install_name_changes(binary, dependencies.get(binary, []), is_dylib=False)
 
     # Fix all bundled dylibs
-    lib_dir = output_dir / "lib"
     if lib_dir.exists():
         print("\nFixing bundled dylibs:")
-        for dylib in lib_dir.glob("*.dylib"):
-            # Skip symlinks, only process actual files
-            if not dylib.is_symlink():
-                fix_binary_dependencies(dylib, is_dylib=True)
+        for dylib in dylibs:
+            changes[dylib] = install_name_changes(dylib, dependencies.get(dylib, []), is_dylib=True)
+
+    # install_name_tool takes any number of -change pairs: one run per file,
+    # and the files are independent, so in parallel
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        runs = [
+            executor.submit(subprocess.run, ["install_name_tool", *file_changes, str(path)], check=True)
+            for path, file_changes in changes.items()
+            if file_changes
+        ]
+        for future in as_completed(runs):
+            future.result()
 
     print("\n✓ Install names fixed")
 
@@ -408,7 +517,7 @@ def copy_iwyu_files(iwyu_path: Path, output_dir: Path) -> None:
     bin_dir.mkdir(parents=True, exist_ok=True)
     share_dir.mkdir(parents=True, exist_ok=True)
 
-    # Copy main binary
+    # Copy main binary (a real copy: fix_install_names rewrites it)
     iwyu_binary = iwyu_path / "bin" / "include-what-you-use"
     if iwyu_binary.exists():
         shutil.copy2(iwyu_binary, bin_dir / "include-what-you-use")
@@ -419,20 +528,20 @@ def copy_iwyu_files(iwyu_path: Path, output_dir: Path) -> None:
     # Copy iwyu_tool.py if it exists
     iwyu_tool = iwyu_path / "bin" / "iwyu_tool.py"
     if iwyu_tool.exists():
-        shutil.copy2(iwyu_tool, bin_dir / "iwyu_tool.py")
+        link_or_copy(iwyu_tool, bin_dir / "iwyu_tool.py")
         print("✓ Copied: iwyu_tool.py")
 
     # Copy fix_includes.py if it exists
     fix_includes = iwyu_path / "bin" / "fix_includes.py"
     if fix_includes.exists():
-        shutil.copy2(fix_includes, bin_dir / "fix_includes.py")
+        link_or_copy(fix_includes, bin_dir / "fix_includes.py")
         print("✓ Copied: fix_includes.py")
 
     # Copy mapping files from share directory
     iwyu_share = iwyu_path / "share" / "include-what-you-use"
     if iwyu_share.exists():
         for mapping_file in iwyu_share.glob("*.imp"):
-            shutil.copy2(mapping_file, share_dir)
+            link_or_copy(mapping_file, share_dir / mapping_file.name)
             print(f"✓ Copied: {mapping_file.name}")
     else:
         print(f"⚠️  No mapping files found at: {iwyu_share}")
@@ -20,8 +20,12 @@ import argparse
 import shutil
 import subprocess
 import sys
+import threading
 from pathlib import Path
 
+# Seconds to allow the extraction container (image pull + apt) to run
+DOCKER_TIMEOUT = 300
+
 
 def print_section(title: str) -> None:
     """Print a formatted section header."""
@@ -96,15 +100,27 @@ def extract_libunwind_from_docker(
     lib_dir.mkdir(parents=True, exist_ok=True)
 
     # Create extraction script to run inside container
-    # This script installs libunwind-dev and copies the files
+    # This script downloads the libunwind packages and copies the files.
+    # The .debs are only unpacked with dpkg-deb: no apt install transaction
+    # (dependency resolution, unpacking dependencies, triggers) is needed
+    # just to read their contents
     extract_script = f"""#!/bin/bash
 set -e
 
-echo "Updating package lists..."
-apt-get update -qq
-
-echo "Installing libunwind-dev..."
-apt-get install -y -qq libunwind-dev
+echo "Downloading libunwind-dev and libunwind8..."
+cd /tmp
+# Only refresh the package lists (tens of MB) if the image has none that
+# know these packages; images with preloaded lists skip the update
+if ! apt-get download -qq libunwind-dev libunwind8 2>/dev/null; then
+    echo "Updating package lists..."
+    apt-get update -qq
+    apt-get download libunwind-dev libunwind8
+fi
+
+echo "Unpacking packages..."
+for deb in *.deb; do
+    dpkg-deb -x "$deb" /tmp/root
+done
 
 echo "Creating output directories..."
 mkdir -p /output/include /output/lib
@@ -112,8 +128,8 @@ mkdir -p /output/include /output/lib
 echo "Copying headers..."
 # Copy all libunwind headers
 for header in libunwind.h libunwind-common.h libunwind-{header_arch}.h libunwind-dynamic.h libunwind-ptrace.h unwind.h; do
-    if [ -f "/usr/include/$header" ]; then
-        cp -v "/usr/include/$header" /output/include/
+    if [ -f "/tmp/root/usr/include/$header" ]; then
+        cp -v "/tmp/root/usr/include/$header" /output/include/
     else
         echo "Warning: $header not found"
     fi
@@ -130,7 +146,7 @@ echo "Copying libraries..."
 #   etc.
 
 # Copy all libunwind related files from the lib directory
-for lib in /usr/lib/{lib_arch}/libunwind*.so*; do
+for lib in /tmp/root/usr/lib/{lib_arch}/libunwind*.so*; do
     if [ -e "$lib" ]; then
         # If it's a symlink, preserve it
         if [ -L "$lib" ]; then
@@ -163,8 +179,11 @@ echo "Extraction complete!"
     print()
 
     try:
-        # We mount the output directory and run the extraction script
-        result = subprocess.run(
+        # We mount the output directory and run the extraction script.
+        # Output is streamed as it arrives (stderr merged in) rather than
+        # buffered until exit, so a slow image pull doesn't look like a hang
+        timed_out = threading.Event()
+        with subprocess.Popen(
             [
                 "docker",
                 "run",
@@ -178,21 +197,34 @@ echo "Extraction complete!"
                 "-c",
                 extract_script,
             ],
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
-            timeout=300,  # 5 minute timeout
-        )
-
-        print(result.stdout)
+            bufsize=1,
+        ) as process:
+
+            def kill_on_timeout() -> None:
+                timed_out.set()
+                process.kill()
+
+            # Killing docker closes the pipe, which ends the loop below
+            timer = threading.Timer(DOCKER_TIMEOUT, kill_on_timeout)
+            timer.start()
+            try:
+                for line in process.stdout:
+                    print(line, end="", flush=True)
+            finally:
+                timer.cancel()
+            returncode = process.wait()
+
+        if timed_out.is_set():
+            print("ERROR: Docker extraction timed out")
+            return False
 
-        if result.returncode != 0:
+        if returncode != 0:
             print("ERROR: Docker extraction failed")
-            print(result.stderr)
             return False
 
-    except subprocess.TimeoutExpired:
-        print("ERROR: Docker extraction timed out")
-        return False
     except FileNotFoundError:
         print("ERROR: Docker not found")
         return False
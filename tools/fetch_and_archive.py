@@ -7,7 +7,7 @@ This script automates the entire process:
 2. Strips them of unnecessary extras (keeping only essential build tools)
 3. Deduplicates identical binaries
 4. Creates hard-linked structure
-5. Compresses with zstd level 22
+5. Compresses with zstd level 19 plus long-distance matching
 6. Names according to convention: llvm-{version}-{platform}-{arch}.tar.zst
 7. Generates checksums
 8. Places final archive in ../assets/clang/{platform}/{arch}/
@@ -34,6 +34,11 @@ import urllib.request
 from pathlib import Path
 from typing import Any
 
+try:
+    from .zstd_utils import DEFAULT_ZSTD_LEVEL, zstd_compressor
+except ImportError:
+    from zstd_utils import DEFAULT_ZSTD_LEVEL, zstd_compressor
+
 # ============================================================================
 # Configuration
 # ============================================================================
@@ -1639,12 +1644,12 @@ def verify_tar_permissions(tar_file: Path) -> int:
 # ============================================================================
 
 
-def compress_with_zstd(tar_file: Path, output_zst: Path, level: int = 22) -> Path:
+def compress_with_zstd(tar_file: Path, output_zst: Path, level: int = DEFAULT_ZSTD_LEVEL) -> Path:
     """Compress tar with zstd using streaming compression for better interrupt handling."""
     print_section(f"STEP 7: COMPRESS WITH ZSTD LEVEL {level}")
 
     try:
-        import zstandard as zstd
+        import zstandard  # noqa: F401
     except ImportError as e:
         raise ImportError("zstandard module required!\nInstall with: pip install zstandard") from e
 
@@ -1666,7 +1671,9 @@ def compress_with_zstd(tar_file: Path, output_zst: Path, level: int = 22) -> Pat
     start = time.time()
 
     try:
-        cctx = zstd.ZstdCompressor(level=level, threads=-1)
+        # Multi-threaded, with long-distance matching so duplicate code
+        # across binaries further apart than the level's window still matches
+        cctx = zstd_compressor(level, source_size=file_size)
 
         # Use streaming compression instead of loading entire file
         # Use 1MB chunks for better interrupt responsiveness on Windows
@@ -1715,13 +1722,13 @@ def compress_with_zstd(tar_file: Path, output_zst: Path, level: int = 22) -> Pat
             # Print final newline and show finalizing message
             print()
             print("  Data read complete. Now finalizing compression...")
-            print("  NOTE: Level 22 compression requires flushing buffers - this may take 30-60 seconds...")
+            print("  NOTE: High-level compression requires flushing buffers - this may take 30-60 seconds...")
             print("  (The process is NOT stalled, just working hard to achieve maximum compression)")
             print()
             finalize_start = time.time()
 
         # The with block closes here, which triggers the final compression flush
-        # This is where most of the CPU time is actually spent for level 22
+        # This is where most of the CPU time is actually spent at high levels
         finalize_elapsed = time.time() - finalize_start
         print(f"  Finalization complete! ({finalize_elapsed:.1f}s)")
         print()
@@ -1877,39 +1884,18 @@ echo "  tar --zstd -xf {archive_path.name}"
     with contextlib.suppress(Exception):
         os.chmod(join_script_path, 0o755)
 
-    # Also create Python join script for Windows
+    # Also create Python join script for Windows: a copy of the generic
+    # tools/join.py plus a manifest naming this archive's parts
     py_script_name = f"{archive_path.name}.join.py"
     py_script_path = archive_path.parent / py_script_name
+    join_manifest_path = archive_path.parent / f"{archive_path.name}.join.json"
 
-    python_script = f"""#!/usr/bin/env python3
-\"\"\"Join script for {archive_path.name}\"\"\"
-import sys
-from pathlib import Path
-
-parts = {[p.name for p in parts]}
-output = "{archive_path.name}"
+    join_manifest = {"output": archive_path.name, "parts": [p.name for p in parts]}
+    with open(join_manifest_path, "w") as f:
+        json.dump(join_manifest, f, indent=2)
+        f.write("\n")
 
-print(f"Joining {{len(parts)}} parts into {{output}}...")
-
-try:
-    with open(output, 'wb') as out:
-        for part in parts:
-            print(f"  Adding {{part}}...")
-            with open(part, 'rb') as inp:
-                out.write(inp.read())
-
-    size_mb = Path(output).stat().st_size / (1024 * 1024)
-    print(f"\\nDone! Created {{output}} ({{size_mb:.2f}} MB)")
-    print("\\nTo extract:")
-    print(f"  tar --zstd -xf {{output}}")
-
-except Exception as e:
-    print(f"Error: {{e}}", file=sys.stderr)
-    sys.exit(1)
-"""
-
-    with open(py_script_path, "w") as f:
-        f.write(python_script)
+    shutil.copyfile(Path(__file__).with_name("join.py"), py_script_path)
 
     print()
     print("Summary:")
@@ -1919,7 +1905,7 @@ except Exception as e:
     print()
     print("Join scripts created:")
     print(f"  {join_script_name} (for Linux/Mac)")
-    print(f"  {py_script_name} (for Windows/cross-platform)")
+    print(f"  {py_script_name} + {join_manifest_path.name} (for Windows/cross-platform)")
     print()
     print("To rejoin:")
     print(f"  bash {join_script_name}")
@@ -1969,7 +1955,12 @@ Note: Press Ctrl+C at any time to safely interrupt the operation.
         default=None,
         help="Output directory (default: ../assets/clang/{platform}/{arch})",
     )
-    parser.add_argument("--zstd-level", type=int, default=22, help="Zstd compression level (default: 22)")
+    parser.add_argument(
+        "--zstd-level",
+        type=int,
+        default=DEFAULT_ZSTD_LEVEL,
+        help=f"Zstd compression level (default: {DEFAULT_ZSTD_LEVEL})",
+    )
     parser.add_argument("--keep-intermediate", action="store_true", help="Keep intermediate files (for debugging)")
 
     args = parser.parse_args()
@@ -0,0 +1,32 @@
+"""
+Shared file helpers for the packaging scripts.
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+
+def copy_file_fast(src: Path, dst: Path) -> None:
+    """
+    Copy src to dst (contents and metadata), keeping the data in the kernel.
+
+    Uses copy_file_range on Linux, which reflinks on btrfs/XFS instead of
+    copying; elsewhere (or if the filesystem refuses) shutil.copy2, which
+    already uses sendfile/fcopyfile where available.
+    """
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass  # Unsupported by this filesystem pair: plain copy below
+
+    shutil.copy2(src, dst)
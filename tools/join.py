@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Join split archive parts back into the original archive.
+
+The parts are described by a small JSON manifest:
+
+    {
+      "output": "llvm-21.1.5-linux-x86_64.tar.zst",
+      "parts": ["llvm-21.1.5-linux-x86_64.tar.zst.part1", "llvm-21.1.5-linux-x86_64.tar.zst.part2"]
+    }
+
+Paths are relative to the manifest. fetch_and_archive.py ships a copy of
+this script as <archive>.join.py next to <archive>.join.json, which it
+reads by default, so the script itself is identical for every archive.
+
+This file must stay standard-library only: it runs on end-user machines.
+
+Usage:
+    python llvm-21.1.5-linux-x86_64.tar.zst.join.py
+    python tools/join.py --manifest path/to/archive.tar.zst.join.json
+"""
+
+import argparse
+import contextlib
+import json
+import mmap
+import os
+import shutil
+import sys
+from pathlib import Path
+
+CHUNK_SIZE = 8 * 1024 * 1024
+PIPE_SIZE = 1024 * 1024
+# writev() byte budget per call; macOS rejects iovec totals above INT_MAX
+MAX_WRITEV_BYTES = 1024 * 1024 * 1024
+
+
+def splice_part(inp, out) -> None:
+    """Copy inp to out through a pipe with splice() (Linux only, zero-copy)."""
+    read_fd, write_fd = os.pipe()
+    try:
+        try:
+            import fcntl
+
+            fcntl.fcntl(write_fd, fcntl.F_SETPIPE_SZ, PIPE_SIZE)
+        except (ImportError, AttributeError, OSError):
+            pass
+        offset = 0
+        while True:
+            moved = os.splice(inp.fileno(), write_fd, PIPE_SIZE, offset_src=offset)
+            if moved == 0:
+                return
+            offset += moved
+            while moved:
+                moved -= os.splice(read_fd, out.fileno(), moved)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+def sendfile_part(inp, out) -> None:
+    """Copy inp to out with sendfile()."""
+    offset = 0
+    while True:
+        sent = os.sendfile(out.fileno(), inp.fileno(), offset, CHUNK_SIZE)
+        if sent == 0:
+            return
+        offset += sent
+
+
+def copy_part(inp, out) -> None:
+    """Append one part to the output, using the fastest copy available.
+
+    Prefers splice(), then sendfile(); falls back to a fixed-size buffered
+    copy where neither can target regular files (macOS, Windows). A
+    fallback is only taken if nothing was written yet.
+    """
+    start = out.tell()
+    for kernel_copy in (splice_part, sendfile_part):
+        try:
+            kernel_copy(inp, out)
+            return
+        except (AttributeError, OSError):
+            if out.tell() != start:
+                raise
+    shutil.copyfileobj(inp, out, length=CHUNK_SIZE)
+    out.flush()
+
+
+def writev_parts(parts: list[Path], out) -> None:
+    """Gather all parts into out with mmap() + writev().
+
+    Used where splice()/sendfile() can't write to regular files: each part
+    is mapped read-only and the kernel copies straight from the mapped
+    pages, batching as many parts per writev() call as fit the byte budget.
+    """
+    iov_max = os.sysconf("SC_IOV_MAX") if "SC_IOV_MAX" in os.sysconf_names else 1024
+
+    with contextlib.ExitStack() as stack:
+        slices = []
+        for part in parts:
+            print(f"  Adding {part.name}...")
+            f = stack.enter_context(open(part, "rb"))
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                continue
+            view = memoryview(stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)))
+            stack.callback(view.release)
+            for offset in range(0, size, MAX_WRITEV_BYTES):
+                piece = view[offset : offset + MAX_WRITEV_BYTES]
+                stack.callback(piece.release)
+                slices.append(piece)
+
+        out.flush()
+        index = 0
+        while index < len(slices):
+            batch = []
+            batch_bytes = 0
+            for piece in slices[index : index + iov_max]:
+                if batch and batch_bytes + len(piece) > MAX_WRITEV_BYTES:
+                    break
+                batch.append(piece)
+                batch_bytes += len(piece)
+
+            written = os.writev(out.fileno(), batch)
+
+            # Drop fully written slices; trim a partially written one
+            for piece in batch:
+                if written < len(piece):
+                    slices[index] = piece[written:]
+                    stack.callback(slices[index].release)
+                    break
+                written -= len(piece)
+                index += 1
+
+
+def join_parts(parts: list[Path], output: Path) -> Path:
+    """Concatenate parts, in order, into output.
+
+    Args:
+        parts: Part files in order
+        output: Archive to create (overwritten if it exists)
+
+    Returns:
+        Path to the joined archive
+    """
+    print(f"Joining {len(parts)} parts into {output.name}...")
+
+    total_size = sum(part.stat().st_size for part in parts)
+
+    with open(output, "wb") as out:
+        # Reserve the whole output up front: one extent allocation instead
+        # of growing the file on every write
+        if total_size and hasattr(os, "posix_fallocate"):
+            with contextlib.suppress(OSError):
+                os.posix_fallocate(out.fileno(), 0, total_size)
+
+        if not sys.platform.startswith("linux") and hasattr(os, "writev"):
+            writev_parts(parts, out)
+            return output
+
+        for part in parts:
+            print(f"  Adding {part.name}...")
+            with open(part, "rb") as inp:
+                copy_part(inp, out)
+
+    return output
+
+
+def load_manifest(manifest_path: Path) -> tuple[list[Path], Path]:
+    """Read a join manifest.
+
+    Args:
+        manifest_path: Path to <archive>.join.json
+
+    Returns:
+        Tuple of (part paths, output path), resolved against the manifest's directory
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    base_dir = manifest_path.parent
+    parts = [base_dir / part for part in manifest["parts"]]
+    output = base_dir / manifest["output"]
+    return parts, output
+
+
+def main() -> int:
+    """Main entry point."""
+    # <archive>.join.py defaults to its sibling <archive>.join.json
+    default_manifest = Path(sys.argv[0]).with_suffix(".json")
+
+    parser = argparse.ArgumentParser(description="Join split archive parts")
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        default=default_manifest,
+        help=f"Join manifest JSON (default: {default_manifest.name})",
+    )
+    args = parser.parse_args()
+
+    try:
+        parts, output = load_manifest(args.manifest)
+        join_parts(parts, output)
+
+        size_mb = output.stat().st_size / (1024 * 1024)
+        print(f"\nDone! Created {output.name} ({size_mb:.2f} MB)")
+        print("\nTo extract:")
+        print(f"  tar --zstd -xf {output.name}")
+        return 0
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Shared tar extraction helpers for the download and extraction scripts.
+"""
+
+import shutil
+import subprocess
+import sys
+import tarfile
+from pathlib import Path
+from typing import Any
+
+# Keyword arguments for tarfile extraction. The "data" filter (3.12+, also
+# backported to 3.10.12/3.11.4) rejects unsafe members and drops owner
+# information. Pythons without it get numeric_owner instead, which skips
+# user/group name lookups when running as root
+TAR_EXTRACT_KWARGS: dict[str, Any] = (
+    {"filter": "data"} if hasattr(tarfile, "data_filter") else {"numeric_owner": True}
+)
+
+
+def extract_with_system_tar(
+    archive_path: Path,
+    output_dir: Path,
+    compress_args: list[str],
+    decompressor: str,
+    env: dict[str, str] | None = None,
+) -> bool:
+    """
+    Extract a compressed tar archive with the system tar.
+
+    Skips tarfile's per-member Python overhead, which dominates on
+    multi-thousand-file LLVM trees.
+
+    Args:
+        archive_path: Path to the archive file
+        output_dir: Directory to extract to
+        compress_args: tar arguments selecting the decompressor
+            (e.g. ["-J"] or ["--use-compress-program=zstd -d -T0"])
+        decompressor: Program those arguments run, which must be on PATH
+        env: Environment for tar (default: inherit), e.g. to set XZ_OPT
+
+    Returns:
+        True if tar extracted the archive, False if the caller should fall back
+        to Python extraction (Windows, tar or decompressor missing, or tar failed)
+    """
+    if sys.platform == "win32" or not (shutil.which("tar") and shutil.which(decompressor)):
+        return False
+
+    try:
+        subprocess.run(
+            ["tar", *compress_args, "-xf", str(archive_path), "-C", str(output_dir)],
+            check=True,
+            capture_output=True,
+            text=True,
+            env=env,
+        )
+    except (subprocess.CalledProcessError, OSError) as e:
+        stderr = getattr(e, "stderr", None) or e
+        print(f"System tar failed ({str(stderr).strip()}), falling back to Python extraction")
+        return False
+    return True
@@ -7,6 +7,9 @@ Tests:
 - bzip2 (levels 1-9)
 - xz (levels 0-9, plus extreme mode)
 - zstd (levels 1-22)
+- zstd with a dictionary trained on the input files
+- zstd with a dictionary trained on another tree (e.g. another platform's
+  binaries), modelling one dictionary shared across a platform matrix
 """
 
 import os
@@ -23,6 +26,12 @@ except ImportError:
     print("Warning: zstandard module not available")
     zstd = None
 
+# Dictionary training: sample the first DICT_SAMPLE_BYTES of every file, in
+# DICT_SAMPLE_SIZE pieces, into a DICT_SIZE dictionary
+DICT_SIZE = 1024 * 1024
+DICT_SAMPLE_SIZE = 128 * 1024
+DICT_SAMPLE_BYTES = 1024 * 1024
+
 
 def format_size(bytes_size: int) -> str:
     """Format bytes as human-readable string."""
@@ -180,6 +189,86 @@ def test_zstd_python(source_dir: str, output_base: str, levels: list[int] | None
     return results
 
 
+def collect_dictionary_samples(directory: Path) -> list[bytes]:
+    """Cut the head of every regular file under directory into training samples."""
+    samples = []
+    for path in sorted(directory.rglob("*")):
+        if path.is_file() and not path.is_symlink():
+            with open(path, "rb") as f:
+                head = f.read(DICT_SAMPLE_BYTES)
+            samples.extend(head[i : i + DICT_SAMPLE_SIZE] for i in range(0, len(head), DICT_SAMPLE_SIZE))
+    return samples
+
+
+def test_zstd_dictionary(
+    source_dir: str, output_base: str, levels: list[int] | None = None, dict_source_dir: str | None = None
+) -> list[dict[str, Any]]:
+    """Test zstd compression with a trained dictionary.
+
+    Archives compressed this way can only be decompressed with the same
+    dictionary, so it would have to ship alongside them (or in the
+    downloader). By default the dictionary is trained on the input files and
+    the reported size includes it, for a fair comparison against plain zstd.
+
+    With dict_source_dir (e.g. the linux tree when compressing the win one),
+    the dictionary is trained on that other tree instead. That models one
+    dictionary shared by a whole platform matrix, so its size is reported
+    separately rather than charged to this archive.
+    """
+    if zstd is None:
+        print("Skipping zstd dictionary tests (module not available)")
+        return []
+
+    if levels is None:
+        levels = [19, 22]
+
+    source_path = Path(source_dir)
+    shared = dict_source_dir is not None
+    samples = collect_dictionary_samples(Path(dict_source_dir) if shared else source_path)
+
+    print(f"Training {format_size(DICT_SIZE)} dictionary on {len(samples)} samples...", end=" ", flush=True)
+    start = time.time()
+    try:
+        dict_data = zstd.train_dictionary(DICT_SIZE, samples, threads=-1)
+    except zstd.ZstdError as e:
+        print(f"failed ({e}), skipping")
+        return []
+    train_time = time.time() - start
+    dict_bytes = dict_data.as_bytes()
+    print(f"{format_size(len(dict_bytes))} in {format_time(train_time)}")
+
+    import io
+
+    tar_buffer = io.BytesIO()
+    with tarfile.open(fileobj=tar_buffer, mode="w") as tar:
+        tar.add(source_path, arcname=source_path.name)
+    tar_data = tar_buffer.getvalue()
+
+    results = []
+    for level in levels:
+        output = f"{output_base}_zstd{level}_dict.tar.zst"
+        print(f"Testing zstd level {level} with dictionary...", end=" ", flush=True)
+
+        start = time.time()
+        cctx = zstd.ZstdCompressor(level=level, dict_data=dict_data)
+        compressed = cctx.compress(tar_data)
+        with open(output, "wb") as f:
+            f.write(compressed)
+        elapsed = time.time() - start
+
+        if shared:
+            size = len(compressed)
+            print(f"{format_size(size)} (+ {format_size(len(dict_bytes))} shared dictionary) in {format_time(elapsed)}")
+        else:
+            size = len(compressed) + len(dict_bytes)
+            print(f"{format_size(size)} (incl. dictionary) in {format_time(elapsed)}")
+
+        method = f"zstd-{level}+shared-dict" if shared else f"zstd-{level}+dict"
+        results.append({"method": method, "file": output, "size": size, "time": elapsed})
+
+    return results
+
+
 def print_results_table(all_results: list[dict[str, Any]]) -> None:
     """Print formatted results table."""
     print("\n" + "=" * 80)
@@ -210,15 +299,18 @@ def print_results_table(all_results: list[dict[str, Any]]) -> None:
 
 def main() -> None:
     if len(sys.argv) < 2:
-        print("Usage: python test_compression.py <directory_to_compress> [output_prefix]")
+        print("Usage: python test_compression.py <directory_to_compress> [output_prefix] [dictionary_training_dir]")
         sys.exit(1)
 
     source_dir = sys.argv[1]
     output_base = sys.argv[2] if len(sys.argv) > 2 else "compressed"
+    # e.g. the linux LLDB tree, to measure a dictionary shared across platforms
+    dict_source_dir = sys.argv[3] if len(sys.argv) > 3 else None
 
-    if not Path(source_dir).exists():
-        print(f"Error: Directory '{source_dir}' does not exist")
-        sys.exit(1)
+    for directory in (source_dir, dict_source_dir):
+        if directory and not Path(directory).exists():
+            print(f"Error: Directory '{directory}' does not exist")
+            sys.exit(1)
 
     print(f"Testing compression methods on: {source_dir}")
     print(f"Output prefix: {output_base}")
@@ -251,6 +343,20 @@ def main() -> None:
         print("=" * 80)
         all_results.extend(test_zstd_python(source_dir, output_base, levels=[1, 3, 10, 15, 19, 22]))
 
+        print("\n" + "=" * 80)
+        print("ZSTD COMPRESSION WITH TRAINED DICTIONARY")
+        print("=" * 80)
+        all_results.extend(test_zstd_dictionary(source_dir, output_base, levels=[19, 22]))
+
+        if dict_source_dir:
+            print("\n" + "=" * 80)
+            print(f"ZSTD COMPRESSION WITH DICTIONARY SHARED FROM {dict_source_dir}")
+            print("=" * 80)
+            shared_results = test_zstd_dictionary(
+                source_dir, f"{output_base}_shared", levels=[19, 22], dict_source_dir=dict_source_dir
+            )
+            all_results.extend(shared_results)
+
     # Print final results
     print_results_table(all_results)
 
@@ -0,0 +1,53 @@
+"""
+Shared zstd helpers for the archive creation scripts.
+
+Every .tar.zst this repository publishes is compressed with the same level,
+window and long-distance matching setup, so it is defined once here.
+"""
+
+import hashlib
+
+# Default zstd level. Long-distance matching over a 128 MB window finds
+# duplicate code across whole binaries at far less CPU time than level 22;
+# 128 MB is the largest window stock zstd decoders accept without --long
+DEFAULT_ZSTD_LEVEL = 19
+ZSTD_WINDOW_LOG = 27
+
+
+def zstd_compressor(level: int = DEFAULT_ZSTD_LEVEL, source_size: int = 0, threads: int = -1):
+    """Multi-threaded ZstdCompressor with long-distance matching enabled.
+
+    Args:
+        level: Zstd compression level
+        source_size: Size of the input if known (0 = unknown)
+        threads: Zstd worker threads (-1 = one per CPU)
+    """
+    import zstandard as zstd
+
+    params = zstd.ZstdCompressionParameters.from_level(
+        level,
+        source_size=source_size,
+        window_log=ZSTD_WINDOW_LOG,
+        enable_ldm=True,
+        threads=threads,
+    )
+    return zstd.ZstdCompressor(compression_params=params)
+
+
+class HashingWriter:
+    """File wrapper that SHA-256 hashes everything written through it.
+
+    Wrapping the output file of a compressor stream yields the archive's
+    checksum as it is written, without reading the archive back.
+    """
+
+    def __init__(self, f) -> None:
+        self.f = f
+        self.hash = hashlib.sha256()
+
+    def write(self, data) -> int:
+        self.hash.update(data)
+        return self.f.write(data)
+
+    def hexdigest(self) -> str:
+        return self.hash.hexdigest()